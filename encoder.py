@@ -2,26 +2,210 @@
 Frame encoding module for image compression.
 """
 
+import functools
+import os
+
 import cv2
+import numpy as np
+
+try:
+    from turbojpeg import TurboJPEG, TJPF_BGR, TJSAMP_420, TJSAMP_422, TJSAMP_444
+    # TURBOJPEG_LIB points at a libturbojpeg outside the default search paths
+    _tj = TurboJPEG(os.environ.get("TURBOJPEG_LIB"))
+    _TURBO_SUBSAMPLING = {"4:2:0": TJSAMP_420, "4:2:2": TJSAMP_422, "4:4:4": TJSAMP_444}
+except (ImportError, OSError, RuntimeError):  # PyTurboJPEG or libturbojpeg not available
+    _tj = None
+
+# OpenCV < 4.5.5 has no sampling-factor flag and always writes 4:2:0
+_CV2_SUBSAMPLING = {
+    "4:2:0": getattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR_420", None),
+    "4:2:2": getattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR_422", None),
+    "4:4:4": getattr(cv2, "IMWRITE_JPEG_SAMPLING_FACTOR_444", None),
+}
+
+# Default max_height. A 1080x1920 portrait frame at max_width=512 goes out 432x768 instead
+# of 512x910: both cost two 512px image tiles, but the smaller one has about 30% fewer
+# pixels to encode and upload
+MAX_HEIGHT = 768
 
+_REDUCED_COLOR_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
 
-def encode_jpeg(frame, quality=85):
+
+def fit_width(width, height, max_width, max_height=MAX_HEIGHT):
     """
-    Encode a frame as JPEG bytes.
+    Return the (width, height) a frame is downscaled to so it fits max_width and max_height.
+    
+    The aspect ratio is preserved, so whichever limit is tighter decides the scale.
+    Frames already within both limits keep their size, and neither side is scaled below
+    one pixel.
+    
+    Args:
+        width: Frame width in pixels
+        height: Frame height in pixels
+        max_width: Maximum width in pixels, or None for no width limit
+        max_height: Maximum height in pixels, or None for no height limit (default: MAX_HEIGHT)
+    
+    Raises:
+        ValueError: If max_width or max_height is less than 1
+    """
+    for name, limit in (("max_width", max_width), ("max_height", max_height)):
+        if limit is not None and limit < 1:
+            raise ValueError(f"{name} must be at least 1 pixel: {limit}")
+    if (max_width is None or width <= max_width) and (max_height is None or height <= max_height):
+        return width, height
+    if max_height is None or (max_width is not None and height * max_width <= max_height * width):
+        return max_width, max(1, int(height * max_width / width))
+    return max(1, int(width * max_height / height)), max_height
+
+
+def resize_for_api(frame, max_width, max_height=MAX_HEIGHT, dst=None):
+    """
+    Downscale a frame to fit max_width and max_height, preserving aspect ratio.
+    
+    Frames that do not need shrinking are returned as-is without a copy.
     
     Args:
         frame: Video frame (numpy array)
+        max_width: Maximum width in pixels, or None for no width limit
+        max_height: Maximum height in pixels, or None for no height limit (default: MAX_HEIGHT)
+        dst: Optional preallocated output array of the target shape
+    
+    Returns:
+        Resized frame (dst if given, or frame itself if no resize was needed)
+    """
+    new_width, new_height = fit_width(frame.shape[1], frame.shape[0], max_width, max_height)
+    return resize_to(frame, new_width, new_height, dst=dst)
+
+
+def resize_to(frame, width, height, dst=None):
+    """
+    Resize a frame to exactly width x height.
+    
+    Large reductions first halve the frame with cv2.pyrDown, which is several times
+    faster than INTER_AREA over the same span, and finish with a small INTER_AREA step.
+    
+    Args:
+        frame: Video frame (numpy array)
+        width: Output width in pixels
+        height: Output height in pixels
+        dst: Optional preallocated (height, width) output array
+    
+    Returns:
+        Resized frame (dst if given, or frame itself if it already has that size)
+    """
+    if frame.shape[:2] == (height, width):
+        if dst is None:
+            return frame
+        dst[...] = frame
+        return dst
+
+    while frame.shape[1] > 2 * width and frame.shape[0] > 2 * height:
+        frame = cv2.pyrDown(frame)
+    return cv2.resize(frame, (width, height), dst=dst, interpolation=cv2.INTER_AREA)
+
+
+def encode_jpeg(frame, quality=85, optimize=True, subsampling="4:2:0"):
+    """
+    Encode a frame as JPEG bytes.
+    
+    Uses libjpeg-turbo (via PyTurboJPEG) when available, falling back to OpenCV.
+    CUDA tensors (from extract_keyframes with keep_on_gpu) are encoded on the GPU.
+    
+    Args:
+        frame: Video frame (BGR numpy array, or (3, H, W) RGB uint8 CUDA tensor)
         quality: JPEG quality (1-100, default: 85)
+        optimize: Use optimized Huffman tables for a 3-5% smaller file at the same quality
+            (default: True; applies to the OpenCV encoder, PyTurboJPEG does not expose it)
+        subsampling: Chroma subsampling - "4:2:0", "4:2:2" or "4:4:4" (default: "4:2:0",
+            the smallest and fastest to encode and decode)
     
     Returns:
         JPEG-encoded frame as bytes
     
     Raises:
+        ValueError: If subsampling is not one of the supported modes
         RuntimeError: If encoding fails
     """
-    encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
-    success, buffer = cv2.imencode(".jpg", frame, encode_param)
+    if subsampling not in _CV2_SUBSAMPLING:
+        raise ValueError(f"Unknown subsampling: {subsampling}. Options: 4:2:0, 4:2:2, 4:4:4")
+
+    if getattr(frame, "is_cuda", False):
+        return encode_jpeg_cuda(frame, quality=quality)
+
+    if _tj is not None and frame.ndim == 3 and frame.shape[2] == 3:
+        # Frames from OpenCV/PyAV are already BGR, so no colour conversion is needed
+        return _tj.encode(frame, quality=quality, pixel_format=TJPF_BGR, jpeg_subsample=_TURBO_SUBSAMPLING[subsampling])
+
+    success, buffer = cv2.imencode(".jpg", frame, _cv2_params(quality, optimize, subsampling))
     if not success:
         raise RuntimeError("Failed to encode frame")
     return buffer.tobytes()
 
+
+@functools.lru_cache(maxsize=32)
+def _cv2_params(quality, optimize, subsampling):
+    """Build the cv2.imencode parameters once per setting, rather than once per frame."""
+    # Flags are passed as 1/0 rather than True/False, which some OpenCV builds reject
+    params = (
+        int(cv2.IMWRITE_JPEG_QUALITY), int(quality),
+        int(cv2.IMWRITE_JPEG_OPTIMIZE), 1 if optimize else 0,
+        int(cv2.IMWRITE_JPEG_PROGRESSIVE), 0,
+    )
+    if _CV2_SUBSAMPLING[subsampling] is not None:
+        params += (int(cv2.IMWRITE_JPEG_SAMPLING_FACTOR), int(_CV2_SUBSAMPLING[subsampling]))
+    return params
+
+
+def encode_jpeg_cuda(frames, quality=85):
+    """
+    Encode frames that are already in GPU memory as JPEG with nvJPEG.
+    
+    Only the compressed bytes are copied back to the host. Passing a list encodes the
+    whole batch in one call, amortizing kernel launches across frames.
+    
+    Args:
+        frames: (3, H, W) RGB uint8 CUDA tensor, or a list of them
+        quality: JPEG quality (1-100, default: 85)
+    
+    Returns:
+        JPEG-encoded frame as bytes, or a list of bytes if a list was given
+    
+    Raises:
+        RuntimeError: If torchvision is not installed or encoding fails
+    """
+    try:
+        from torchvision.io import encode_jpeg as nvjpeg_encode
+    except ImportError as e:
+        raise RuntimeError("GPU JPEG encoding requires the 'torchvision' package") from e
+
+    encoded = nvjpeg_encode(frames, quality=quality)
+    if isinstance(frames, list):
+        return [data.cpu().numpy().tobytes() for data in encoded]
+    return encoded.cpu().numpy().tobytes()
+
+
+def decode_jpeg(data, reduction=1):
+    """
+    Decode JPEG bytes to a BGR frame, optionally downscaling while decoding.
+    
+    libjpeg can decode directly at 1/2, 1/4 or 1/8 size by truncating each 8x8 DCT
+    block, which skips most of the IDCT work and the separate resize pass.
+    
+    Args:
+        data: JPEG file contents as bytes
+        reduction: Downscale factor applied during decoding - 1, 2, 4 or 8 (default: 1)
+    
+    Returns:
+        Decoded frame (numpy array), or None if the data cannot be decoded
+    """
+    if _tj is not None:
+        try:
+            return _tj.decode(data, pixel_format=TJPF_BGR, scaling_factor=(1, reduction))
+        except OSError:
+            pass  # Let OpenCV try formats libjpeg-turbo rejects
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), _REDUCED_COLOR_FLAGS[reduction])
@@ -9,9 +9,9 @@ from video_analysis import summarize_video
 def main():
     """Main entry point for CLI usage."""
     if len(sys.argv) < 2:
-        print("Usage: python main.py <video_path> [style]")
+        print("Usage: python -m examples.summarize_video <video_path> [style]")
         print("Styles: short, timeline, detailed, technical")
-        print("Example: python main.py videos/demo.mp4 timeline")
+        print("Example: python -m examples.summarize_video videos/demo.mp4 timeline")
         sys.exit(1)
     
     video_path = sys.argv[1]
@@ -0,0 +1,61 @@
+"""
+Near-duplicate frame detection module.
+
+Frames from low-motion stretches of a video look alike once downscaled, so sending
+all of them costs upload time and image tokens without telling the model anything new.
+"""
+
+import cv2
+import numpy as np
+
+
+def phash(frame):
+    """
+    Compute a 64-bit perceptual hash of a frame.
+    
+    The frame is shrunk to 32x32 grayscale and transformed with a DCT. Each bit records
+    whether one of the 8x8 lowest-frequency coefficients is above their median, so the
+    hash follows the frame's overall structure and ignores noise, compression artefacts
+    and small changes in exposure.
+    
+    Args:
+        frame: Video frame (BGR or grayscale numpy array)
+    
+    Returns:
+        Hash as an int
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8]
+    bits = np.packbits(low > np.median(low))
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+def hash_distance(a, b):
+    """Return the number of differing bits between two frame hashes."""
+    return (a ^ b).bit_count()
+
+
+def drop_near_duplicates(frames, threshold):
+    """
+    Yield frames whose perceptual hash differs from the last kept frame's by at least threshold bits.
+    
+    Args:
+        frames: Iterable of frames (numpy arrays)
+        threshold: Minimum phash distance (0-64) from the last kept frame for a frame
+            to be kept; 0 keeps every frame
+    
+    Yields:
+        The first frame and each later frame that is not a near-duplicate of the one
+        kept before it
+    """
+    if threshold <= 0:
+        yield from frames
+        return
+
+    last = None
+    for frame in frames:
+        frame_hash = phash(frame)
+        if last is None or hash_distance(frame_hash, last) >= threshold:
+            last = frame_hash
+            yield frame
@@ -2,10 +2,55 @@
 Frame extraction module for video processing.
 """
 
+import bisect
+import math
+import multiprocessing
+import os
+import queue
+import threading
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
 import cv2
+import numpy as np
+
+try:
+    import av
+except ImportError:  # PyAV is optional; fall back to OpenCV decoding
+    av = None
+
+from encoder import MAX_HEIGHT, fit_width, resize_for_api, resize_to
+from video_probe import probe_video, probe_keyframes
+
+# Ranges shorter than this are decoded in-process; spawning workers costs more than it saves
+PARALLEL_MIN_DURATION_SEC = 120
+
+# Decoder processes shared by all parallel extractions, so concurrent calls queue for the
+# same workers instead of each forking a full set
+_DECODE_WORKERS = min(8, os.cpu_count() or 1)
+
+# Most samples decoded per worker task. Long ranges are split into many small chunks, so
+# only a few chunks' frames are held in memory at once
+_CHUNK_FRAMES = 16
+
+# Slack when matching probed timestamps (printed with microsecond precision) to frame times
+_TIMESTAMP_TOLERANCE = 1e-3
+
+# Sentinel the iter_keyframes producer thread queues after the last frame
+_END_OF_FRAMES = object()
+
+# Set in worker processes so each decoder stays single-threaded (workers already fill the cores)
+_single_threaded = False
+
+_decode_pool = None
+_decode_pool_lock = threading.Lock()
 
+# What the decoders need to plan their seeks, probed once by the caller rather than in every
+# worker process
+_StreamLayout = namedtuple("_StreamLayout", ["keyframes", "variable_frame_rate"])
 
-def extract_keyframes(video_path, interval_sec=2, start_time=None, end_time=None, max_width=512):
+
+def extract_keyframes(video_path, interval_sec=2, start_time=None, end_time=None, max_width=512, backend=None, keyframes_only=False, workers=None, keep_on_gpu=False, max_height=MAX_HEIGHT):
     """
     Extract keyframes from a video at regular intervals.
     
@@ -15,61 +60,599 @@ def extract_keyframes(video_path, interval_sec=2, start_time=None, end_time=None
         start_time: Start time in seconds (None for beginning of video)
         end_time: End time in seconds (None for end of video)
         max_width: Maximum width for frame resizing in pixels (default: 512, low for cost savings)
+        max_height: Maximum height for frame resizing in pixels (default: 768); frames are
+            scaled to fit within both limits
+        backend: Decoding backend - "pyav", "opencv" or "torchcodec" (None to use PyAV when
+            installed). "opencv" asks FFmpeg for hardware decoding (VAAPI/NVDEC/VideoToolbox)
+            when available; "torchcodec" decodes on the GPU when CUDA is available
+        keyframes_only: Only sample keyframes, taking the first one at or after each interval
+            (fastest when the interval is coarser than the video's GOP; needs ffprobe or PyAV)
+        workers: Maximum chunks of a long range decoded at once on the shared pool of up to
+            eight decoder processes (None for the pool size, 1 to decode in this process;
+            ignored by "torchcodec", which must not share a CUDA context across processes)
+        keep_on_gpu: With "torchcodec" on CUDA, resize on the GPU and return the frames as
+            (3, H, W) RGB uint8 CUDA tensors instead of copying them back to the host;
+            encode_jpeg encodes these with nvJPEG
     
     Returns:
-        List of frames (numpy arrays, resized if max_width is set)
+        List of frames (numpy arrays, or CUDA tensors with keep_on_gpu; resized to fit max_width and max_height)
     
     Raises:
-        ValueError: If video file cannot be opened or time range is invalid
+        ValueError: If video file cannot be opened, interval or time range is invalid, backend
+            is unknown or keyframes_only is set but keyframes cannot be listed
     """
-    cap = cv2.VideoCapture(video_path)
-    if not cap.isOpened():
-        raise ValueError(f"Cannot open video file: {video_path}")
+    backend, targets = _plan_samples(video_path, interval_sec, start_time, end_time, backend, keyframes_only)
+    if not targets:
+        return []
 
-    fps = cap.get(cv2.CAP_PROP_FPS)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    duration = total_frames / fps if fps > 0 else 0
+    if backend == "torchcodec":
+        return _decode_torchcodec(video_path, targets, max_width, max_height, keep_on_gpu)
+
+    layout = _stream_layout(video_path)
+    chunks = _split_targets(targets, workers)
+    if chunks is None:
+        return _extract_chunk(video_path, backend, targets, max_width, max_height, layout)
+
+    frames = []
+    for chunk_frames in _map_chunks(video_path, backend, chunks, max_width, max_height, layout, workers):
+        frames.extend(chunk_frames)
+    return frames
+
+
+def iter_keyframes(video_path, interval_sec=2, start_time=None, end_time=None, max_width=512, backend=None, keyframes_only=False, workers=None, prefetch=2, max_height=MAX_HEIGHT):
+    """
+    Yield keyframes one at a time while the next ones are decoded in the background.
+    
+    Takes the same sampling arguments as extract_keyframes. Decoding and resizing run on
+    a producer thread (OpenCV and FFmpeg release the GIL), so a caller that encodes each
+    frame as it arrives overlaps that work with decoding the next frame. At most prefetch
+    decoded frames are waiting in the queue at once. Long ranges are decoded in small
+    chunks on the shared worker pool as in extract_keyframes; each chunk's frames are
+    yielded as soon as it is done, with at most `workers` chunks in flight.
+    
+    Args:
+        workers: Maximum chunks of a long range decoded at once (None for the pool size,
+            1 to decode on the producer thread)
+        prefetch: Maximum number of decoded frames waiting to be consumed (default: 2)
+    
+    Yields:
+        Frames (numpy arrays, resized to fit max_width and max_height) in timestamp order
+    
+    Raises:
+        ValueError: If video file cannot be opened, interval or time range is invalid, backend
+            is unknown or keyframes_only is set but keyframes cannot be listed
+    """
+    backend, targets = _plan_samples(video_path, interval_sec, start_time, end_time, backend, keyframes_only)
+    if not targets:
+        return
+    if backend == "torchcodec":
+        # torchcodec decodes every target in one batched call, so there is nothing to overlap
+        yield from _decode_torchcodec(video_path, targets, max_width, max_height, keep_on_gpu=False)
+        return
+
+    pending = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def put(item):
+        # Poll so the producer exits promptly when the consumer stops early
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    layout = _stream_layout(video_path)
+    chunks = _split_targets(targets, workers)
+
+    def produce():
+        try:
+            if chunks is None:
+                for frame in _iter_frames(video_path, backend, targets, layout):
+                    if not put(resize_for_api(frame, max_width, max_height)):
+                        return
+            else:
+                for chunk_frames in _map_chunks(video_path, backend, chunks, max_width, max_height, layout, workers):
+                    for frame in chunk_frames:
+                        if not put(frame):
+                            return
+        except Exception as e:  # Re-raised in the consumer
+            put(e)
+        else:
+            put(_END_OF_FRAMES)
+
+    producer = threading.Thread(target=produce, name="keyframe-decoder", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = pending.get()
+            if item is _END_OF_FRAMES:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+
+
+def _plan_samples(video_path, interval_sec, start_time, end_time, backend, keyframes_only):
+    """
+    Validate the sampling arguments and compute the timestamps to decode.
+    
+    Returns:
+        Tuple of (backend, sorted sample timestamps in seconds)
     
-    # Validate and set time range
+    Raises:
+        ValueError: If video file cannot be opened, interval or time range is invalid, backend
+            is unknown or keyframes_only is set but keyframes cannot be listed
+    """
+    if interval_sec <= 0:
+        raise ValueError(f"Interval must be positive: {interval_sec}")
+    if backend is None:
+        backend = "pyav" if av is not None else "opencv"
+    if backend == "pyav" and av is None:
+        raise ValueError("PyAV backend requested but the 'av' package is not installed")
+    if backend not in ("pyav", "opencv", "torchcodec"):
+        raise ValueError(f"Unknown backend: {backend}. Options: pyav, opencv, torchcodec")
+
+    info = probe_video(video_path)
+    start_time, end_time = _resolve_time_range(start_time, end_time, info.duration)
+
+    targets = []
+    target = start_time
+    while target <= end_time:
+        targets.append(target)
+        target += interval_sec
+    if info.fps > 0 and not info.variable_frame_rate:
+        targets = _collapse_to_frames(targets, info.fps)
+
+    if keyframes_only:
+        targets = _snap_to_keyframes(video_path, targets, end_time)
+
+    return backend, targets
+
+
+def _collapse_to_frames(targets, fps):
+    """
+    Drop targets that land on the same frame as the previous one.
+    
+    Intervals shorter than one frame would otherwise decode the same frame repeatedly.
+    Each target maps to the first frame at or after it, as in the decoders.
+    """
+    collapsed = []
+    last_frame = None
+    for target in targets:
+        frame_index = max(0, math.ceil((target - _TIMESTAMP_TOLERANCE) * fps))
+        if frame_index != last_frame:
+            collapsed.append(target)
+            last_frame = frame_index
+    return collapsed
+
+
+def _init_worker():
+    """Keep each decoder process single-threaded to avoid oversubscribing the CPU."""
+    global _single_threaded
+    _single_threaded = True
+    os.environ["OMP_NUM_THREADS"] = "1"
+    cv2.setNumThreads(1)
+
+
+def _resolve_time_range(start_time, end_time, duration):
+    """
+    Apply defaults to a requested time range and validate it against the video duration.
+    
+    Returns:
+        Tuple of (start_time, end_time) in seconds
+    
+    Raises:
+        ValueError: If the time range is invalid
+    """
     if start_time is None:
         start_time = 0.0
     if end_time is None:
         end_time = duration
-    
+
     if start_time < 0:
         raise ValueError(f"Start time cannot be negative: {start_time}")
     if end_time > duration:
         raise ValueError(f"End time ({end_time}s) exceeds video duration ({duration:.2f}s)")
     if start_time >= end_time:
         raise ValueError(f"Start time ({start_time}s) must be less than end time ({end_time}s)")
+    return start_time, end_time
+
+
+class _FrameBuffer:
+    """
+    Contiguous (N, H, W, 3) array that sampled frames are resized into in place.
     
-    # Convert times to frame numbers
-    start_frame = int(start_time * fps)
-    end_frame = int(end_time * fps)
-    frame_interval = int(fps * interval_sec)
+    The array is allocated once, on the first frame, instead of allocating a separate
+    buffer per resized frame.
+    """
 
-    # Seek to start position
-    cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    def __init__(self, capacity, max_width, max_height):
+        self.capacity = capacity
+        self.max_width = max_width
+        self.max_height = max_height
+        self.array = None
+        self.count = 0
 
-    frames = []
-    frame_id = start_frame
-    original_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-    original_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    def add(self, frame):
+        """
+        Resize a frame into the next free slot.
+        
+        The slot size is fixed by the first frame (fitted to max_width and max_height), so a stream whose
+        resolution changes midway still fills every slot, scaled to the first frame's size.
+        """
+        if self.array is None:
+            new_width, new_height = fit_width(frame.shape[1], frame.shape[0], self.max_width, self.max_height)
+            self.array = np.empty((self.capacity, new_height, new_width) + frame.shape[2:], dtype=frame.dtype)
 
-    while frame_id <= end_frame:
-        ret, frame = cap.read()
-        if not ret:
+        slot = self.array[self.count]
+        resize_to(frame, slot.shape[1], slot.shape[0], dst=slot)
+        self.count += 1
+
+    def frames(self):
+        """Return the filled slots as a list of views into the shared array."""
+        if self.array is None:
+            return []
+        return list(self.array[:self.count])
+
+
+def _snap_to_keyframes(video_path, targets, end_time):
+    """
+    Replace each target timestamp with the first keyframe at or after it.
+    
+    Targets that map to the same keyframe are merged, so each keyframe is decoded once.
+    The lookup is a bisect over the cached keyframe list; FFmpeg is not involved.
+    
+    Raises:
+        ValueError: If the keyframes of the video cannot be listed
+    """
+    keyframes = probe_keyframes(video_path)
+    if keyframes is None:
+        raise ValueError("keyframes_only requires ffprobe or the 'av' package to list keyframes")
+
+    snapped = []
+    for target in targets:
+        # Timestamps are parsed from text, so allow for rounding when matching a keyframe
+        i = bisect.bisect_left(keyframes, target - _TIMESTAMP_TOLERANCE)
+        if i == len(keyframes) or keyframes[i] > end_time:
             break
-        if frame_id % frame_interval == 0:
-            # Resize frame if max_width is specified and frame is larger
-            if max_width is not None and original_width > max_width:
-                scale = max_width / original_width
-                new_width = max_width
-                new_height = int(original_height * scale)
-                frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_AREA)
-            frames.append(frame)
-        frame_id += 1
-
-    cap.release()
-    return frames
+        if not snapped or keyframes[i] > snapped[-1]:
+            snapped.append(keyframes[i])
+    return snapped
+
+
+def _split_targets(targets, workers):
+    """
+    Split sample timestamps into contiguous chunks of at most _CHUNK_FRAMES for the worker pool.
+    
+    Returns:
+        List of chunks, or None if the range is too short (or workers is 1) to decode in parallel
+    """
+    if workers is None:
+        workers = _DECODE_WORKERS
+    workers = min(workers, len(targets))
+    if workers <= 1 or targets[-1] - targets[0] < PARALLEL_MIN_DURATION_SEC:
+        return None
+
+    # Each worker seeks to the keyframe preceding its first sample, so chunks decode
+    # independent GOPs
+    chunk_size = min(-(-len(targets) // workers), _CHUNK_FRAMES)
+    return [targets[i:i + chunk_size] for i in range(0, len(targets), chunk_size)]
+
+
+def _map_chunks(video_path, backend, chunks, max_width, max_height, layout, workers):
+    """
+    Decode chunks on the shared worker pool, yielding each chunk's frame list in order.
+    
+    At most `workers` chunks are submitted ahead of the one being consumed, so decoded
+    frames are held for only that many chunks however long the range.
+    """
+    in_flight = min(workers or _DECODE_WORKERS, _DECODE_WORKERS)
+    pool = _get_decode_pool()
+    pending = deque()
+    try:
+        for chunk in chunks:
+            if len(pending) >= in_flight:
+                yield pending.popleft().result()
+            pending.append(pool.submit(_extract_chunk, video_path, backend, chunk, max_width, max_height, layout))
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _get_decode_pool():
+    """
+    Return the shared decoder process pool, starting it on first use.
+    
+    Workers are started with forkserver (spawn where unavailable), not fork: the pool is
+    first used from iter_keyframes' producer thread, and forking a threaded process can
+    deadlock the child.
+    """
+    global _decode_pool
+    if _decode_pool is None:
+        with _decode_pool_lock:
+            if _decode_pool is None:
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                _decode_pool = ProcessPoolExecutor(
+                    max_workers=_DECODE_WORKERS, mp_context=multiprocessing.get_context(method),
+                    initializer=_init_worker,
+                )
+    return _decode_pool
+
+
+def _stream_layout(video_path):
+    """Probe what the decoders need to plan their seeks (cached, so cheap after the first call)."""
+    return _StreamLayout(probe_keyframes(video_path), probe_video(video_path).variable_frame_rate)
+
+
+def _extract_chunk(video_path, backend, targets, max_width, max_height, layout):
+    """
+    Extract the frames for a sorted list of sample timestamps with its own decoder.
+    
+    Args:
+        video_path: Path to the video file
+        backend: Decoding backend - "pyav" or "opencv"
+        targets: Sorted sample timestamps in seconds
+        max_width: Maximum width for frame resizing in pixels
+        max_height: Maximum height for frame resizing in pixels
+        layout: _StreamLayout probed by the caller
+    
+    Returns:
+        List of frames (numpy arrays) in timestamp order
+    """
+    frames = _FrameBuffer(len(targets), max_width, max_height)
+    for frame in _iter_frames(video_path, backend, targets, layout):
+        frames.add(frame)
+    return frames.frames()
+
+
+def _iter_frames(video_path, backend, targets, layout):
+    """Yield the full-size decoded frame at each target timestamp with the given backend."""
+    if backend == "pyav":
+        return _decode_pyav(video_path, targets, layout.keyframes)
+    return _decode_opencv(video_path, targets, layout)
+
+
+def _open_pyav(video_path):
+    """Open a video with PyAV, raising ValueError if it has no readable video stream."""
+    try:
+        container = av.open(video_path)
+    except av.error.FFmpegError as e:
+        raise ValueError(f"Cannot open video file: {video_path}") from e
+    if not container.streams.video:
+        container.close()
+        raise ValueError(f"No video stream found in: {video_path}")
+    stream = container.streams.video[0]
+    if not _single_threaded:
+        stream.thread_type = "AUTO"
+    return container
 
+
+def _decode_pyav(video_path, targets, keyframes):
+    """
+    Decode and yield the frame at each target timestamp with PyAV.
+    
+    A target in a later GOP than the last decoded frame triggers a backward seek to its
+    keyframe, so only the frames between that keyframe and the target are decoded.
+    Targets in the current GOP are reached by decoding forward, which avoids re-decoding
+    the GOP from its keyframe when samples are denser than keyframes.
+    """
+    container = _open_pyav(video_path)
+    try:
+        stream = container.streams.video[0]
+        time_base = stream.time_base
+        stream_start = stream.start_time or 0
+
+        # A freshly opened container decodes from the first frame, so no seek is needed there
+        decoded = container.decode(stream)
+        position = 0.0
+        image = None
+        for target in targets:
+            if image is not None and position >= target - _TIMESTAMP_TOLERANCE:
+                continue  # Same frame as the previous target, as OpenCV collapses it
+            if _needs_seek(keyframes, position, target):
+                container.seek(stream_start + int(target / time_base), stream=stream, backward=True, any_frame=False)
+                decoded = container.decode(stream)
+            for frame in decoded:
+                if frame.pts is not None:
+                    position = float((frame.pts - stream_start) * time_base)
+                    if position >= target - _TIMESTAMP_TOLERANCE:
+                        break
+            else:
+                break  # Reached end of stream before the target
+            image = frame.to_ndarray(format="bgr24")
+            yield image
+    finally:
+        container.close()
+
+
+def _needs_seek(keyframes, position, target):
+    """
+    Decide whether reaching target from the last decoded position needs a seek.
+    
+    Seeking pays off only when a keyframe lies between the two; otherwise the frames in
+    between must be decoded either way. Without a keyframe list, any forward jump seeks.
+    """
+    if keyframes is None:
+        return target - position > _TIMESTAMP_TOLERANCE
+    tolerance = _TIMESTAMP_TOLERANCE
+    return bisect.bisect_right(keyframes, target + tolerance) > bisect.bisect_right(keyframes, position + tolerance)
+
+
+def _gop_frames(keyframes, fps):
+    """Return the median keyframe spacing in frames, or None if it cannot be determined."""
+    if not keyframes or len(keyframes) < 2 or fps <= 0:
+        return None
+    gaps = sorted(b - a for a, b in zip(keyframes, keyframes[1:]))
+    return gaps[len(gaps) // 2] * fps
+
+
+def _decode_torchcodec(video_path, targets, max_width, max_height, keep_on_gpu):
+    """
+    Decode the frame at each target timestamp with torchcodec, on the GPU when available.
+    
+    With keep_on_gpu on a CUDA device, frames are resized on the GPU and returned as CUDA
+    tensors, so no full-size frame is ever copied to the host.
+    
+    Raises:
+        ValueError: If torchcodec is not installed or the video file cannot be opened
+    """
+    try:
+        import torch
+        from torchcodec.decoders import VideoDecoder
+    except ImportError as e:
+        # Imported lazily: torch adds seconds to startup for users of the other backends
+        raise ValueError("torchcodec backend requested but the 'torchcodec' package is not installed") from e
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    try:
+        decoder = VideoDecoder(video_path, device=device)
+    except (RuntimeError, ValueError) as e:
+        raise ValueError(f"Cannot open video file: {video_path}") from e
+
+    metadata = decoder.metadata
+    stream_start = metadata.begin_stream_seconds or 0
+    stream_end = metadata.end_stream_seconds
+    seconds = [stream_start + t for t in targets]
+    if stream_end is not None:
+        # The final target may equal the duration, which has no frame displayed at it
+        seconds = [t for t in seconds if t < stream_end]
+    if not seconds:
+        return []
+
+    batch = decoder.get_frames_played_at(seconds=seconds)
+    if keep_on_gpu and device == "cuda":
+        return [_resize_tensor(frame, max_width, max_height) for frame in batch.data]
+
+    # (N, C, H, W) RGB -> (N, H, W, C) BGR to match the other backends
+    data = batch.data.permute(0, 2, 3, 1).flip(-1).cpu().numpy()
+
+    frames = _FrameBuffer(len(seconds), max_width, max_height)
+    for frame in data:
+        frames.add(frame)
+    return frames.frames()
+
+
+def _resize_tensor(frame, max_width, max_height):
+    """Downscale a (3, H, W) uint8 tensor to fit max_width and max_height on its device, preserving aspect ratio."""
+    import torch.nn.functional as F
+
+    height, width = frame.shape[1:]
+    new_width, new_height = fit_width(width, height, max_width, max_height)
+    if (new_width, new_height) == (width, height):
+        return frame
+    # "area" matches OpenCV's INTER_AREA used by the CPU backends
+    resized = F.interpolate(frame[None].float(), size=(new_height, new_width), mode="area")
+    return resized[0].round().clamp(0, 255).to(frame.dtype)
+
+
+def _open_capture(video_path):
+    """
+    Open a VideoCapture, asking FFmpeg for hardware-accelerated decoding when available.
+    
+    Falls back to a plain software capture on OpenCV builds without
+    CAP_PROP_HW_ACCELERATION (< 4.5.2) or when the accelerated open fails.
+    """
+    if hasattr(cv2, "CAP_PROP_HW_ACCELERATION"):
+        cap = cv2.VideoCapture(video_path, cv2.CAP_FFMPEG, [
+            cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY,
+            cv2.CAP_PROP_HW_DEVICE, -1,
+        ])
+        # Without a usable device FFmpeg decodes in software, which is still a valid capture
+        if cap.isOpened():
+            return cap
+        cap.release()
+    return cv2.VideoCapture(video_path)
+
+
+def _decode_opencv(video_path, targets, layout):
+    """
+    Decode and yield the frame at each target timestamp with OpenCV.
+    
+    Targets at least one GOP apart are each reached with a seek; denser targets are
+    reached by sequentially grabbing the range, since every frame in it must be decoded.
+    Variable frame rate videos are walked from the start by frame timestamp, since
+    OpenCV seeks by frame index and maps timestamps to indices with the average rate.
+    """
+    cap = _open_capture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video file: {video_path}")
+
+    if layout.variable_frame_rate:
+        try:
+            yield from _walk_timestamps(cap, targets)
+        finally:
+            cap.release()
+        return
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    # Index of the first frame at or after each target
+    target_frames = [max(0, math.ceil((t - _TIMESTAMP_TOLERANCE) * fps)) for t in targets]
+
+    # Sampling at least one GOP apart: seek to each target, decoding only from its keyframe.
+    # Denser sampling: decode the range sequentially, as seeking would re-decode each GOP
+    gop = _gop_frames(layout.keyframes, fps)
+    spacing = min((b - a for a, b in zip(target_frames, target_frames[1:])), default=0)
+    seek_each = gop is not None and spacing >= gop
+
+    try:
+        if seek_each:
+            frame_id = 0
+            for target_frame in target_frames:
+                # Frame 0 is where a fresh capture starts; seeking there only costs time
+                if target_frame != frame_id:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, target_frame)
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                frame_id = target_frame + 1
+                yield frame
+            return
+
+        # Seek to start position
+        if target_frames[0] > 0:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target_frames[0])
+
+        # Walk the gaps between targets rather than testing every frame index.
+        # grab() only demuxes and decodes; retrieve() does the colour conversion and
+        # copy into a numpy array, so it is only paid for the frames we keep
+        frame_id = target_frames[0]
+        for target_frame in target_frames:
+            if target_frame < frame_id:
+                continue  # Targets closer together than one frame
+            for _ in range(target_frame - frame_id):
+                if not cap.grab():
+                    return
+            if not cap.grab():
+                return
+            ret, frame = cap.retrieve()
+            if not ret:
+                return
+            frame_id = target_frame + 1
+            yield frame
+    finally:
+        cap.release()
+
+
+def _walk_timestamps(cap, targets):
+    """Grab frames in order and yield the first one at or after each target timestamp."""
+    index = 0
+    while index < len(targets):
+        if not cap.grab():
+            return
+        timestamp = cap.get(cv2.CAP_PROP_POS_MSEC) / 1000
+        if timestamp < targets[index] - _TIMESTAMP_TOLERANCE:
+            continue  # grab() skips the colour conversion retrieve() would do
+        ret, frame = cap.retrieve()
+        if not ret:
+            return
+        yield frame
+        # Targets closer together than one frame all map to this frame
+        while index < len(targets) and targets[index] - _TIMESTAMP_TOLERANCE <= timestamp:
+            index += 1
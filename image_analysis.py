@@ -3,31 +3,152 @@ Image analysis module using GPT-4.1 Vision.
 """
 
 import os
+import io
+import asyncio
+import json
 import cv2
-from pathlib import Path
-from openai import OpenAI
-from dotenv import load_dotenv
-from encoder import encode_jpeg
-from prompt import build_analysis_prompt, build_count_prompt
+import numpy as np
+from PIL import Image
+from encoder import MAX_HEIGHT, encode_jpeg, decode_jpeg, fit_width, resize_for_api
+from prompt import build_analysis_prompt, build_count_prompt, build_batch_prompt
+from vision import call_vision, acall_vision
 
-# Load environment variables
-load_dotenv()
+# Images sent in one analyze_images_batch request, and reply tokens budgeted per image
+MAX_IMAGES_PER_REQUEST = 20
+_BATCH_TOKENS_PER_IMAGE = 500
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# File extensions listed by get_images, lowercase
+IMAGE_EXTENSIONS = frozenset({'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp', '.gif', '.pbm', '.pgm', '.ppm'})
 
 
-def summarize_image(image_path, style="short", model="gpt-4o-mini", max_width=512):
+# Formats the vision API accepts as-is, by Pillow format name. JPEGs pass through
+# directly; PNG and WebP files only when they are smaller than their JPEG re-encode
+_PASSTHROUGH_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "WEBP": "image/webp"}
+
+
+def _sniff_format(data):
+    """Return the Pillow format name of JPEG, PNG or WebP data from its magic bytes, else None."""
+    if data.startswith(b"\xff\xd8\xff"):
+        return "JPEG"
+    if data.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "PNG"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+
+def _read_header(data):
+    """
+    Read an image's format, size and EXIF orientation without decoding its pixels.
+    
+    Returns:
+        Tuple of (Pillow format name, width, height, orientation, animated), or None if
+        Pillow cannot parse the data
+    """
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            orientation = image.getexif().get(0x0112, 1)
+            return image.format, image.width, image.height, orientation, getattr(image, "is_animated", False)
+    except (OSError, ValueError):
+        return None  # Not readable by Pillow; OpenCV may still decode it
+
+
+def _read_image(data, max_width, header):
+    """
+    Decode an image, letting libjpeg downscale large JPEGs during decoding.
+    
+    JPEGs at least twice as wide as max_width are decoded at 1/2, 1/4 or 1/8 size,
+    picking the largest reduction that stays at or above max_width so the final
+    resize still only shrinks. Other formats are decoded at full size.
+    
+    Returns:
+        Decoded frame (numpy array), or None if the image cannot be decoded
+    """
+    reduction = 1
+    if max_width is not None and header is not None:
+        image_format, width, _, orientation, _ = header
+        # Scaled decoding ignores EXIF rotation, so leave rotated photos to OpenCV
+        if image_format == "JPEG" and orientation == 1:
+            reduction = next((n for n in (8, 4, 2) if width // n >= max_width), 1)
+    
+    if reduction > 1:
+        frame = decode_jpeg(data, reduction)
+        if frame is not None:
+            return frame
+    
+    # Decode with OpenCV (supports multiple formats, applies EXIF rotation)
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def _load_image(image_path, max_width, max_height):
+    """
+    Load an image as bytes the vision API accepts, downscaled to fit max_width and max_height.
+    
+    The file is read once. JPEGs (recognised by their magic bytes) that are already
+    small enough are sent unchanged, which skips a decode and re-encode and keeps
+    their original quality. PNG and WebP files that are small enough are sent
+    unchanged only if that is fewer bytes than the JPEG re-encode, as it can be for
+    flat-colour graphics; lossless photos are far larger than a JPEG would be.
+    Anything else is decoded, resized and encoded as JPEG.
+    
+    Returns:
+        Tuple of (image bytes, MIME type)
+    
+    Raises:
+        ValueError: If image cannot be opened or format is not supported
+    """
+    unsupported = (
+        f"Could not open image: {image_path}. "
+        f"Supported formats: JPEG, PNG, BMP, TIFF, WebP, PBM, PGM, PPM"
+    )
+    try:
+        with open(image_path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        raise ValueError(unsupported) from e
+    
+    # Only the formats that can pass through or be decoded at reduced size need a header
+    header = _read_header(data) if _sniff_format(data) is not None else None
+    passthrough = None
+    if header is not None:
+        image_format, width, height, orientation, animated = header
+        if (
+            image_format in _PASSTHROUGH_TYPES
+            and fit_width(width, height, max_width, max_height) == (width, height)
+            and orientation == 1  # Keep decoding rotated photos so OpenCV applies the rotation
+            and not animated
+        ):
+            if image_format == "JPEG":
+                return data, "image/jpeg"
+            passthrough = data, _PASSTHROUGH_TYPES[image_format]
+    
+    frame = _read_image(data, max_width, header)
+    if frame is None:
+        if passthrough is not None:
+            return passthrough
+        raise ValueError(unsupported)
+    
+    # Encode image as JPEG
+    jpeg = encode_jpeg(resize_for_api(frame, max_width, max_height))
+    if passthrough is not None and len(passthrough[0]) <= len(jpeg):
+        return passthrough
+    return jpeg, "image/jpeg"
+
+
+def summarize_image(image_path, style="short", model="gpt-4o-mini", max_width=512, max_height=MAX_HEIGHT):
     """
     Analyze an image using GPT-4.1 Vision.
     
     Supports common image formats: JPEG, PNG, BMP, TIFF, WebP, PBM, PGM, PPM.
-    The image is automatically converted to JPEG for processing.
+    Images the API cannot take as-is, or larger than max_width x max_height, are converted to JPEG.
     
     Args:
         image_path: Path to the image file (supports JPEG, PNG, BMP, TIFF, WebP, etc.)
         style: Analysis style - "short", "detailed", "technical", or "descriptive"
         model: Model to use (default: "gpt-4o-mini" for cost savings, options: "gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-4.1")
         max_width: Maximum frame width in pixels (default: 512, low for cost savings). Lower = cheaper.
+        max_height: Maximum frame height in pixels (default: 768); images are scaled to fit
+            within both limits, so tall images may come out narrower than max_width
     
     Returns:
         Text analysis of the image
@@ -36,90 +157,30 @@ def summarize_image(image_path, style="short", model="gpt-4o-mini", max_width=51
         ValueError: If image cannot be opened or format is not supported
         RuntimeError: If API call fails
     """
-    # Load image using OpenCV (supports multiple formats)
-    frame = cv2.imread(image_path)
-    if frame is None:
-        raise ValueError(
-            f"Could not open image: {image_path}. "
-            f"Supported formats: JPEG, PNG, BMP, TIFF, WebP, PBM, PGM, PPM"
-        )
+    data, mime = _load_image(image_path, max_width, max_height)
     
     print(f"Analyzing image: {image_path}")
     
-    # Resize image if max_width is specified and image is larger
-    original_height, original_width = frame.shape[:2]
-    if max_width is not None and original_width > max_width:
-        scale = max_width / original_width
-        new_width = max_width
-        new_height = int(original_height * scale)
-        frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_AREA)
-    
-    # Encode image as JPEG
-    jpeg = encode_jpeg(frame)
-    
     prompt = build_analysis_prompt(style)
     
-    # Try GPT-4.1 Vision API (Responses API format) - only for gpt-4.1
-    try:
-        if model != "gpt-4.1":
-            raise AttributeError("Responses API only for gpt-4.1")
-        response = client.responses.create(
-            model=model,
-            input=[
-                {
-                    "type": "input_image",
-                    "image": jpeg
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        )
-        result = response.output_text
-        return f"{result}\n\n[Model used: {model}]"
-    except (AttributeError, Exception) as e:
-        # Fallback to standard chat.completions API if responses.create doesn't exist
-        import base64
-        base64_image = base64.b64encode(jpeg).decode('utf-8')
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": prompt
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
-                            }
-                        }
-                    ]
-                }
-            ],
-            max_tokens=1000
-        )
-        result = response.choices[0].message.content
-        return f"{result}\n\n[Model used: {model}]"
-
-
-def count_items(image_path, object_name, model="gpt-4o-mini", max_width=512):
+    result = call_vision([(data, mime)], prompt, model, max_tokens=1000)
+    return f"{result}\n\n[Model used: {model}]"
+
+
+def count_items(image_path, object_name, model="gpt-4o-mini", max_width=512, max_height=MAX_HEIGHT):
     """
     Count specific objects in an image using GPT-4.1 Vision.
     
     Supports common image formats: JPEG, PNG, BMP, TIFF, WebP, PBM, PGM, PPM.
-    The image is automatically converted to JPEG for processing.
+    Images the API cannot take as-is, or larger than max_width x max_height, are converted to JPEG.
     
     Args:
         image_path: Path to the image file (supports JPEG, PNG, BMP, TIFF, WebP, etc.)
         object_name: Name of the object to count (e.g., "person", "car", "robot")
         model: Model to use (default: "gpt-4o-mini" for cost savings, options: "gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-4.1")
         max_width: Maximum frame width in pixels (default: 512, low for cost savings). Lower = cheaper.
+        max_height: Maximum frame height in pixels (default: 768); images are scaled to fit
+            within both limits, so tall images may come out narrower than max_width
     
     Returns:
         String containing the count and any additional information
@@ -128,90 +189,30 @@ def count_items(image_path, object_name, model="gpt-4o-mini", max_width=512):
         ValueError: If image cannot be opened or format is not supported
         RuntimeError: If API call fails
     """
-    # Load image using OpenCV (supports multiple formats)
-    frame = cv2.imread(image_path)
-    if frame is None:
-        raise ValueError(
-            f"Could not open image: {image_path}. "
-            f"Supported formats: JPEG, PNG, BMP, TIFF, WebP, PBM, PGM, PPM"
-        )
+    data, mime = _load_image(image_path, max_width, max_height)
     
     print(f"Counting {object_name} in image: {image_path}")
     
-    # Resize image if max_width is specified and image is larger
-    original_height, original_width = frame.shape[:2]
-    if max_width is not None and original_width > max_width:
-        scale = max_width / original_width
-        new_width = max_width
-        new_height = int(original_height * scale)
-        frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_AREA)
-    
-    # Encode image as JPEG
-    jpeg = encode_jpeg(frame)
-    
     prompt = build_count_prompt(object_name)
     
-    # Try GPT-4.1 Vision API (Responses API format) - only for gpt-4.1
-    try:
-        if model != "gpt-4.1":
-            raise AttributeError("Responses API only for gpt-4.1")
-        response = client.responses.create(
-            model=model,
-            input=[
-                {
-                    "type": "input_image",
-                    "image": jpeg
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        )
-        result = response.output_text
-        return f"{result}\n\n[Model used: {model}]"
-    except (AttributeError, Exception) as e:
-        # Fallback to standard chat.completions API if responses.create doesn't exist
-        import base64
-        base64_image = base64.b64encode(jpeg).decode('utf-8')
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": prompt
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
-                            }
-                        }
-                    ]
-                }
-            ],
-            max_tokens=200
-        )
-        result = response.choices[0].message.content
-        return f"{result}\n\n[Model used: {model}]"
-
-
-def analyze_image_with_prompt(image_path, custom_prompt, model="gpt-4o-mini", max_width=512):
+    result = call_vision([(data, mime)], prompt, model, max_tokens=200)
+    return f"{result}\n\n[Model used: {model}]"
+
+
+def analyze_image_with_prompt(image_path, custom_prompt, model="gpt-4o-mini", max_width=512, max_height=MAX_HEIGHT):
     """
     Analyze an image using GPT-4.1 Vision with a custom prompt.
     
     Supports common image formats: JPEG, PNG, BMP, TIFF, WebP, PBM, PGM, PPM.
-    The image is automatically converted to JPEG for processing.
+    Images the API cannot take as-is, or larger than max_width x max_height, are converted to JPEG.
     
     Args:
         image_path: Path to the image file (supports JPEG, PNG, BMP, TIFF, WebP, etc.)
         custom_prompt: Custom prompt/question to ask about the image
         model: Model to use (default: "gpt-4o-mini" for cost savings, options: "gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-4.1")
         max_width: Maximum frame width in pixels (default: 512, low for cost savings). Lower = cheaper.
+        max_height: Maximum frame height in pixels (default: 768); images are scaled to fit
+            within both limits, so tall images may come out narrower than max_width
     
     Returns:
         Text response to the custom prompt
@@ -220,74 +221,165 @@ def analyze_image_with_prompt(image_path, custom_prompt, model="gpt-4o-mini", ma
         ValueError: If image cannot be opened or format is not supported
         RuntimeError: If API call fails
     """
-    # Load image using OpenCV (supports multiple formats)
-    frame = cv2.imread(image_path)
-    if frame is None:
-        raise ValueError(
-            f"Could not open image: {image_path}. "
-            f"Supported formats: JPEG, PNG, BMP, TIFF, WebP, PBM, PGM, PPM"
-        )
+    data, mime = _load_image(image_path, max_width, max_height)
     
     print(f"Analyzing image with custom prompt: {image_path}")
     
-    # Resize image if max_width is specified and image is larger
-    original_height, original_width = frame.shape[:2]
-    if max_width is not None and original_width > max_width:
-        scale = max_width / original_width
-        new_width = max_width
-        new_height = int(original_height * scale)
-        frame = cv2.resize(frame, (new_width, new_height), interpolation=cv2.INTER_AREA)
+    result = call_vision([(data, mime)], custom_prompt, model, max_tokens=1000)
+    return f"{result}\n\n[Model used: {model}]"
+
+
+async def _arequest(image_path, prompt, model, max_width, max_height, max_tokens):
+    """
+    Send one image and prompt to the vision API without blocking the event loop.
+    
+    Decoding, resizing and JPEG encoding run in a worker thread; the API call is awaited
+    on the async client so many requests can be in flight at once.
+    """
+    data, mime = await asyncio.to_thread(_load_image, image_path, max_width, max_height)
     
-    # Encode image as JPEG
-    jpeg = encode_jpeg(frame)
+    result = await acall_vision([(data, mime)], prompt, model, max_tokens=max_tokens)
+    return f"{result}\n\n[Model used: {model}]"
+
+
+async def asummarize_image(image_path, style="short", model="gpt-4o-mini", max_width=512, max_height=MAX_HEIGHT):
+    """
+    Async variant of summarize_image.
+    
+    Returns:
+        Text analysis of the image
+    
+    Raises:
+        ValueError: If image cannot be opened or format is not supported
+        RuntimeError: If API call fails
+    """
+    return await _arequest(image_path, build_analysis_prompt(style), model, max_width, max_height, max_tokens=1000)
+
+
+async def acount_items(image_path, object_name, model="gpt-4o-mini", max_width=512, max_height=MAX_HEIGHT):
+    """
+    Async variant of count_items.
+    
+    Returns:
+        String containing the count and any additional information
+    
+    Raises:
+        ValueError: If image cannot be opened or format is not supported
+        RuntimeError: If API call fails
+    """
+    return await _arequest(image_path, build_count_prompt(object_name), model, max_width, max_height, max_tokens=200)
+
+
+async def aanalyze_image_with_prompt(image_path, custom_prompt, model="gpt-4o-mini", max_width=512, max_height=MAX_HEIGHT):
+    """
+    Async variant of analyze_image_with_prompt.
+    
+    Returns:
+        Text response to the custom prompt
+    
+    Raises:
+        ValueError: If image cannot be opened or format is not supported
+        RuntimeError: If API call fails
+    """
+    return await _arequest(image_path, custom_prompt, model, max_width, max_height, max_tokens=1000)
+
+
+async def summarize_images_batch(image_paths, style="short", model="gpt-4o-mini", max_width=512, concurrency=8, max_height=MAX_HEIGHT):
+    """
+    Analyze several images concurrently using GPT-4.1 Vision.
+    
+    One request is sent per image, with at most `concurrency` requests in flight at once
+    to stay within the account's rate limits.
+    
+    Args:
+        image_paths: List of image file paths
+        style: Analysis style - "short", "detailed", "technical", or "descriptive"
+        model: Model to use (default: "gpt-4o-mini" for cost savings, options: "gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-4.1")
+        max_width: Maximum frame width in pixels (default: 512, low for cost savings). Lower = cheaper.
+        max_height: Maximum frame height in pixels (default: 768); images are scaled to fit
+            within both limits, so tall images may come out narrower than max_width
+        concurrency: Maximum number of requests in flight (default: 8)
     
-    # Try GPT-4.1 Vision API (Responses API format) - only for gpt-4.1
+    Returns:
+        List of text analyses, in the same order as image_paths
+    
+    Raises:
+        ValueError: If an image cannot be opened or format is not supported
+        RuntimeError: If an API call fails
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def analyze(image_path):
+        async with semaphore:
+            return await asummarize_image(image_path, style=style, model=model, max_width=max_width, max_height=max_height)
+    
+    return await asyncio.gather(*(analyze(path) for path in image_paths))
+
+
+async def analyze_images_batch(image_paths, style="short", model="gpt-4o-mini", max_width=512, batch_size=MAX_IMAGES_PER_REQUEST, max_height=MAX_HEIGHT):
+    """
+    Analyze several images using GPT-4.1 Vision, sending many images per request.
+    
+    Up to batch_size images share one request with a prompt asking for one result per
+    image, which spreads the per-request latency and prompt tokens across the batch.
+    Batches are sent concurrently.
+    
+    Args:
+        image_paths: List of image file paths
+        style: Analysis style - "short", "detailed", "technical", or "descriptive"
+        model: Model to use (default: "gpt-4o-mini" for cost savings, options: "gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-4.1")
+        max_width: Maximum frame width in pixels (default: 512, low for cost savings). Lower = cheaper.
+        max_height: Maximum frame height in pixels (default: 768); images are scaled to fit
+            within both limits, so tall images may come out narrower than max_width
+        batch_size: Maximum number of images per request (default: 20)
+    
+    Returns:
+        List of text analyses, in the same order as image_paths
+    
+    Raises:
+        ValueError: If an image cannot be opened or format is not supported
+        RuntimeError: If an API call fails or its reply cannot be parsed
+    """
+    images = await asyncio.gather(*(asyncio.to_thread(_load_image, path, max_width, max_height) for path in image_paths))
+    batches = [images[i:i + batch_size] for i in range(0, len(images), batch_size)]
+    replies = await asyncio.gather(*(_acall_vision_batch(batch, style, model) for batch in batches))
+    return [f"{result}\n\n[Model used: {model}]" for reply in replies for result in reply]
+
+
+async def _acall_vision_batch(images, style, model):
+    """Send a batch of (bytes, MIME type) images in one request and split the reply per image."""
+    count = len(images)
+    # Each image is preceded by the label the prompt refers to
+    return await acall_vision(
+        images,
+        build_batch_prompt(style, count),
+        model,
+        max_tokens=_BATCH_TOKENS_PER_IMAGE * count,
+        labels=[f"Image {number}:" for number in range(1, count + 1)],
+        parse=lambda reply: _parse_batch_reply(reply, count)
+    )
+
+
+def _parse_batch_reply(reply, count):
+    """
+    Extract the per-image results from a batch reply.
+    
+    Raises:
+        RuntimeError: If the reply is empty, not the requested JSON or has the wrong number of results
+    """
+    if not reply:
+        # A refusal or a reply cut off by a content filter has no text content
+        raise RuntimeError("Batch analysis returned an empty reply")
+    # Models sometimes wrap JSON in a Markdown code fence; take the outermost object
+    start, end = reply.find("{"), reply.rfind("}")
     try:
-        if model != "gpt-4.1":
-            raise AttributeError("Responses API only for gpt-4.1")
-        response = client.responses.create(
-            model=model,
-            input=[
-                {
-                    "type": "input_image",
-                    "image": jpeg
-                },
-                {
-                    "role": "user",
-                    "content": custom_prompt
-                }
-            ]
-        )
-        result = response.output_text
-        return f"{result}\n\n[Model used: {model}]"
-    except (AttributeError, Exception) as e:
-        # Fallback to standard chat.completions API if responses.create doesn't exist
-        import base64
-        base64_image = base64.b64encode(jpeg).decode('utf-8')
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": custom_prompt
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/jpeg;base64,{base64_image}"
-                            }
-                        }
-                    ]
-                }
-            ],
-            max_tokens=1000
-        )
-        result = response.choices[0].message.content
-        return f"{result}\n\n[Model used: {model}]"
+        results = json.loads(reply[start:end + 1])["results"]
+        results = [str(entry["result"]) for entry in results]
+    except (ValueError, KeyError, TypeError) as e:
+        raise RuntimeError(f"Could not parse batch analysis reply: {reply[:200]}") from e
+    if len(results) != count:
+        raise RuntimeError(f"Batch analysis returned {len(results)} results for {count} images")
+    return results
 
 
 def get_images():
@@ -297,17 +389,17 @@ def get_images():
     Returns:
         List of image file paths relative to the images directory
     """
-    images_dir = Path("images")
-    if not images_dir.exists():
-        return []
     
-    # Common image extensions
-    image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff', '.tif', '.webp', '.gif', '.pbm', '.pgm', '.ppm'}
-    
-    image_files = []
-    for file in images_dir.iterdir():
-        if file.is_file() and file.suffix.lower() in image_extensions:
-            image_files.append(f"images/{file.name}")
+    # scandir reports file types from the directory listing, so no per-file stat is needed;
+    # the extension is checked first so other files skip even that
+    names = []
+    try:
+        with os.scandir("images") as entries:
+            for entry in entries:
+                if os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS and entry.is_file():
+                    names.append(entry.name)
+    except (FileNotFoundError, NotADirectoryError):
+        return []
     
-    return sorted(image_files)
-
+    # Sort the bare names, so comparisons skip the shared directory prefix
+    return [f"images/{name}" for name in sorted(names, key=str.lower)]
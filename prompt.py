@@ -2,7 +2,57 @@
 Prompt building module for different summary and analysis styles.
 """
 
+import functools
+import types
 
+_SUMMARY_PROMPTS = types.MappingProxyType({
+    "short": (
+        "Summarize what happens in this video. "
+        "Focus on actions, events, and salient changes. "
+        "Keep it concise."
+    ),
+    "timeline": (
+        "Summarize the video. "
+        "Then produce a timeline of key events with approximate timestamps. "
+        "Format as: [Time] - Event description"
+    ),
+    "detailed": (
+        "Provide a detailed summary of this video. "
+        "Describe key actions, scene changes, objects, people, and timeline. "
+        "Include as much context as possible."
+    ),
+    "technical": (
+        "Provide a technical summary of this video. "
+        "Focus on measurable actions, scene transitions, and objective observations. "
+        "Use bullet points for clarity."
+    )
+})
+
+_ANALYSIS_PROMPTS = types.MappingProxyType({
+    "short": (
+        "Analyze this image. "
+        "Describe what you see, including key objects, people, scenes, and any notable details. "
+        "Keep it concise."
+    ),
+    "detailed": (
+        "Provide a detailed analysis of this image. "
+        "Describe all visible objects, people, scenes, colors, composition, lighting, "
+        "and any other relevant details. Include context and potential interpretations."
+    ),
+    "technical": (
+        "Provide a technical analysis of this image. "
+        "Focus on objective observations: objects, colors, composition, lighting conditions, "
+        "image quality, and measurable characteristics. Use bullet points for clarity."
+    ),
+    "descriptive": (
+        "Provide a rich, descriptive analysis of this image. "
+        "Describe the scene, atmosphere, mood, and visual elements in detail. "
+        "Include artistic and aesthetic observations."
+    )
+})
+
+
+@functools.lru_cache(maxsize=8)
 def build_summary_prompt(style="short"):
     """
     Build a prompt for video summarization based on style.
@@ -13,32 +63,10 @@ def build_summary_prompt(style="short"):
     Returns:
         Prompt string for the summarization task
     """
-    prompts = {
-        "short": (
-            "Summarize what happens in this video. "
-            "Focus on actions, events, and salient changes. "
-            "Keep it concise."
-        ),
-        "timeline": (
-            "Summarize the video. "
-            "Then produce a timeline of key events with approximate timestamps. "
-            "Format as: [Time] - Event description"
-        ),
-        "detailed": (
-            "Provide a detailed summary of this video. "
-            "Describe key actions, scene changes, objects, people, and timeline. "
-            "Include as much context as possible."
-        ),
-        "technical": (
-            "Provide a technical summary of this video. "
-            "Focus on measurable actions, scene transitions, and objective observations. "
-            "Use bullet points for clarity."
-        )
-    }
-    
-    return prompts.get(style, prompts["short"])
+    return _SUMMARY_PROMPTS.get(style, _SUMMARY_PROMPTS["short"])
 
 
+@functools.lru_cache(maxsize=8)
 def build_analysis_prompt(style="short"):
     """
     Build a prompt for image analysis based on style.
@@ -49,32 +77,10 @@ def build_analysis_prompt(style="short"):
     Returns:
         Prompt string for the image analysis task
     """
-    prompts = {
-        "short": (
-            "Analyze this image. "
-            "Describe what you see, including key objects, people, scenes, and any notable details. "
-            "Keep it concise."
-        ),
-        "detailed": (
-            "Provide a detailed analysis of this image. "
-            "Describe all visible objects, people, scenes, colors, composition, lighting, "
-            "and any other relevant details. Include context and potential interpretations."
-        ),
-        "technical": (
-            "Provide a technical analysis of this image. "
-            "Focus on objective observations: objects, colors, composition, lighting conditions, "
-            "image quality, and measurable characteristics. Use bullet points for clarity."
-        ),
-        "descriptive": (
-            "Provide a rich, descriptive analysis of this image. "
-            "Describe the scene, atmosphere, mood, and visual elements in detail. "
-            "Include artistic and aesthetic observations."
-        )
-    }
-    
-    return prompts.get(style, prompts["short"])
+    return _ANALYSIS_PROMPTS.get(style, _ANALYSIS_PROMPTS["short"])
 
 
+@functools.lru_cache(maxsize=256)
 def build_count_prompt(object_name):
     """
     Build a prompt for counting specific objects in an image.
@@ -91,3 +97,23 @@ def build_count_prompt(object_name):
         f"If you cannot determine the exact count, provide your best estimate followed by a brief explanation."
     )
 
+
+
+@functools.lru_cache(maxsize=64)
+def build_batch_prompt(style="short", count=1):
+    """
+    Build a prompt for analyzing several labelled images in one request.
+    
+    Args:
+        style: Analysis style - "short", "detailed", "technical", or "descriptive"
+        count: Number of images in the request
+    
+    Returns:
+        Prompt string asking for one JSON result per image
+    """
+    return (
+        f"We provide {count} images, labelled Image 1 to Image {count}. "
+        f"For each image, independently: {build_analysis_prompt(style)} "
+        f'Respond with only a JSON object of the form {{"results": [{{"image": 1, "result": "..."}}, ...]}} '
+        f"containing exactly one entry per image, in order."
+    )
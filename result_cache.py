@@ -0,0 +1,86 @@
+"""
+Vision API result caching module.
+
+Replies are keyed on a hash of the exact JPEG sent plus the request parameters, so
+asking the same question about the same image again skips the API round trip.
+video_probe keeps its probe results in the same store, under "probe:" keys.
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+try:
+    import diskcache
+except ImportError:  # diskcache is optional; fall back to a per-process cache
+    diskcache = None
+
+CACHE_DIR = Path.home() / ".cache" / "video-summary-mcp" / "results"
+
+# Disk usage cap for the persistent cache (least recently stored entries are evicted)
+SIZE_LIMIT = 1 << 30
+
+# Entries kept by the in-memory fallback
+_MEMORY_ENTRIES = 1024
+
+_lock = threading.Lock()
+_disk = None
+_memory = OrderedDict()
+
+
+def result_key(images, *params):
+    """
+    Build a cache key from encoded images and the parameters that shape the reply.
+    
+    Args:
+        images: JPEG-encoded image as bytes, or a list of them
+        *params: Prompt, model and any other request parameters
+    
+    Returns:
+        Hex digest identifying the request
+    """
+    if isinstance(images, (bytes, bytearray)):
+        images = [images]
+    digest = hashlib.blake2b(digest_size=20)
+    for image in images:
+        digest.update(len(image).to_bytes(8, "little"))
+        digest.update(image)
+    for param in params:
+        text = str(param).encode("utf-8")
+        digest.update(len(text).to_bytes(8, "little"))
+        digest.update(text)
+    return digest.hexdigest()
+
+
+def get_result(key):
+    """Return the cached reply for a key, or None on a miss."""
+    if diskcache is not None:
+        return _open_disk().get(key)
+    with _lock:
+        if key not in _memory:
+            return None
+        _memory.move_to_end(key)
+        return _memory[key]
+
+
+def store_result(key, result):
+    """Cache a reply under a key."""
+    if diskcache is not None:
+        _open_disk().set(key, result)
+        return
+    with _lock:
+        _memory[key] = result
+        _memory.move_to_end(key)
+        while len(_memory) > _MEMORY_ENTRIES:
+            _memory.popitem(last=False)
+
+
+def _open_disk():
+    """Open the persistent cache on first use, so importing this module touches no files."""
+    global _disk
+    if _disk is None:
+        with _lock:
+            if _disk is None:
+                _disk = diskcache.Cache(str(CACHE_DIR), size_limit=SIZE_LIMIT)
+    return _disk
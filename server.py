@@ -7,21 +7,75 @@ from fastmcp import FastMCP
 from video_analysis import (
     summarize_video as summarize_video_core,
     analyze_video_with_prompt as analyze_video_with_prompt_core,
-    get_videos as get_videos_core
+    summarize_video_segments as summarize_video_segments_core,
+    summarize_videos_batch as summarize_videos_batch_core,
+    get_videos as get_videos_core,
+    DEDUP_THRESHOLD,
+    TARGET_LATENCY_SEC
 )
+from encoder import MAX_HEIGHT
 
 from image_analysis import (
     get_images as get_images_core,
     summarize_image as analyze_image_core,
     count_items as count_items_core,
-    analyze_image_with_prompt as analyze_image_with_prompt_core
+    analyze_image_with_prompt as analyze_image_with_prompt_core,
+    summarize_images_batch as summarize_images_batch_core,
+    analyze_images_batch as analyze_images_batch_core
 )
 
 mcp = FastMCP("video-summarizer")
 
 
+def _coerce_time_args(start_time, end_time, interval_sec, max_width, max_height):
+    """
+    Convert video tool arguments to numbers and apply defaults.
+    
+    MCP clients may send numbers as strings, so each value is coerced once here
+    rather than in every tool.
+    
+    Returns:
+        Tuple of (start_time, end_time, interval_sec, max_width, max_height); start_time
+        and end_time stay None when not given, interval_sec defaults to 10 and the sizes
+        as in _coerce_size_args
+    """
+    return (
+        float(start_time) if start_time is not None else None,
+        float(end_time) if end_time is not None else None,
+        float(interval_sec) if interval_sec is not None else 10,
+        *_coerce_size_args(max_width, max_height),
+    )
+
+
+def _coerce_size_args(max_width, max_height):
+    """
+    Convert the frame and image size tool arguments to ints and apply defaults.
+    
+    Returns:
+        Tuple of (max_width, max_height); max_width defaults to 512 and max_height to MAX_HEIGHT
+    """
+    return (
+        int(max_width) if max_width is not None else 512,
+        int(max_height) if max_height is not None else MAX_HEIGHT,
+    )
+
+
+def _coerce_sampling_args(dedup_threshold, target_latency_sec, dedup_default=DEDUP_THRESHOLD):
+    """
+    Convert the frame sampling tool arguments to numbers and apply defaults.
+    
+    Returns:
+        Tuple of (dedup_threshold, target_latency_sec); dedup_threshold defaults to
+        dedup_default and target_latency_sec to TARGET_LATENCY_SEC
+    """
+    return (
+        int(dedup_threshold) if dedup_threshold is not None else dedup_default,
+        float(target_latency_sec) if target_latency_sec is not None else TARGET_LATENCY_SEC,
+    )
+
+
 @mcp.tool()
-def summarize_video(video_path: str, style: str = "short", start_time: Optional[Union[float, int, str]] = None, end_time: Optional[Union[float, int, str]] = None, interval_sec: Optional[Union[float, int, str]] = None, max_width: Optional[Union[int, str]] = None, model: str = "gpt-4o-mini") -> str:
+def summarize_video(video_path: str, style: str = "short", start_time: Optional[Union[float, int, str]] = None, end_time: Optional[Union[float, int, str]] = None, interval_sec: Optional[Union[float, int, str]] = None, max_width: Optional[Union[int, str]] = None, max_height: Optional[Union[int, str]] = None, model: str = "gpt-4o-mini", upload_frames: bool = False, dedup_threshold: Optional[Union[int, str]] = None, adaptive: bool = False, target_latency_sec: Optional[Union[float, int, str]] = None) -> str:
     """
     Summarize the content of a video using GPT-4.1 Vision.
     
@@ -32,30 +86,24 @@ def summarize_video(video_path: str, style: str = "short", start_time: Optional[
         end_time: Optional end time in seconds (None for end of video)
         interval_sec: Interval in seconds between extracted frames (default: 10, reasonable for cost savings). Higher = cheaper.
         max_width: Maximum frame width in pixels (default: 512, low for cost savings). Lower = cheaper.
+        max_height: Maximum frame height in pixels (default: 768). Frames are scaled to fit both max_width and max_height, so portrait and tall frames come out narrower than max_width; raise it to keep more detail in tall frames. Lower = cheaper.
         model: Model to use (default: "gpt-4o-mini" for cost savings, options: "gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-4.1")
+        upload_frames: Upload frames through the Files API instead of inlining them as base64 (gpt-4.1 only; the files are deleted after the request; default: False).
+        dedup_threshold: Skip frames within this many bits (of 64) of the previous kept frame's perceptual hash (default: 5; 0 sends every sampled frame). Higher = cheaper.
+        adaptive: Send fewer frames (stretching interval_sec up to 4x) while recent API requests average longer than target_latency_sec (default: False)
+        target_latency_sec: Average request latency in seconds that adaptive aims for (default: 15)
     
     Returns:
         Text summary of the video
     """
-    # Convert inputs to float if needed (for MCP compatibility)
-    if start_time is not None:
-        start_time = float(start_time)
-    if end_time is not None:
-        end_time = float(end_time)
-    if interval_sec is not None:
-        interval_sec = float(interval_sec)
-    if max_width is not None:
-        max_width = int(max_width)
+    start_time, end_time, interval_sec, max_width, max_height = _coerce_time_args(start_time, end_time, interval_sec, max_width, max_height)
+    dedup_threshold, target_latency_sec = _coerce_sampling_args(dedup_threshold, target_latency_sec)
     
-    # Use defaults if not specified
-    interval_sec = interval_sec if interval_sec is not None else 10
-    max_width = max_width if max_width is not None else 512
-    
-    return summarize_video_core(video_path, style=style, start_time=start_time, end_time=end_time, interval_sec=interval_sec, max_width=max_width, model=model)
+    return summarize_video_core(video_path, style=style, start_time=start_time, end_time=end_time, interval_sec=interval_sec, max_width=max_width, max_height=max_height, model=model, upload_frames=upload_frames, dedup_threshold=dedup_threshold, adaptive=adaptive, target_latency_sec=target_latency_sec)
 
 
 @mcp.tool()
-def analyze_video_with_prompt(video_path: str, custom_prompt: str, start_time: Optional[Union[float, int, str]] = None, end_time: Optional[Union[float, int, str]] = None, interval_sec: Optional[Union[float, int, str]] = None, max_width: Optional[Union[int, str]] = None, model: str = "gpt-4o-mini") -> str:
+def analyze_video_with_prompt(video_path: str, custom_prompt: str, start_time: Optional[Union[float, int, str]] = None, end_time: Optional[Union[float, int, str]] = None, interval_sec: Optional[Union[float, int, str]] = None, max_width: Optional[Union[int, str]] = None, max_height: Optional[Union[int, str]] = None, model: str = "gpt-4o-mini", upload_frames: bool = False, dedup_threshold: Optional[Union[int, str]] = None, adaptive: bool = False, target_latency_sec: Optional[Union[float, int, str]] = None) -> str:
     """
     Analyze a video using GPT-4.1 Vision with a custom prompt/question.
     
@@ -72,30 +120,89 @@ def analyze_video_with_prompt(video_path: str, custom_prompt: str, start_time: O
         end_time: Optional end time in seconds (None for end of video). Can be number or string.
         interval_sec: Interval in seconds between extracted frames (default: 10, reasonable for cost savings). Higher = cheaper.
         max_width: Maximum frame width in pixels (default: 512, low for cost savings). Lower = cheaper.
+        max_height: Maximum frame height in pixels (default: 768). Frames are scaled to fit both max_width and max_height, so portrait and tall frames come out narrower than max_width; raise it to keep more detail in tall frames. Lower = cheaper.
         model: Model to use (default: "gpt-4o-mini" for cost savings, options: "gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-4.1")
+        upload_frames: Upload frames through the Files API instead of inlining them as base64 (gpt-4.1 only; the files are deleted after the request; default: False).
+        dedup_threshold: Skip frames within this many bits (of 64) of the previous kept frame's perceptual hash (default: 0, sending every sampled frame, since a question may hinge on a small change). Higher = cheaper.
+        adaptive: Send fewer frames (stretching interval_sec up to 4x) while recent API requests average longer than target_latency_sec (default: False)
+        target_latency_sec: Average request latency in seconds that adaptive aims for (default: 15)
     
     Returns:
         Text response to the custom prompt
     """
+    start_time, end_time, interval_sec, max_width, max_height = _coerce_time_args(start_time, end_time, interval_sec, max_width, max_height)
+    dedup_threshold, target_latency_sec = _coerce_sampling_args(dedup_threshold, target_latency_sec, dedup_default=0)
+    
+    return analyze_video_with_prompt_core(video_path, custom_prompt, start_time=start_time, end_time=end_time, interval_sec=interval_sec, max_width=max_width, max_height=max_height, model=model, upload_frames=upload_frames, dedup_threshold=dedup_threshold, adaptive=adaptive, target_latency_sec=target_latency_sec)
+
+
+@mcp.tool()
+async def summarize_video_segments(video_path: str, segments: list[list[Optional[Union[float, int, str]]]], style: str = "short", interval_sec: Optional[Union[float, int, str]] = None, max_width: Optional[Union[int, str]] = None, max_height: Optional[Union[int, str]] = None, model: str = "gpt-4o-mini", upload_frames: bool = False, dedup_threshold: Optional[Union[int, str]] = None, adaptive: bool = False, target_latency_sec: Optional[Union[float, int, str]] = None) -> list[str]:
+    """
+    Summarize several time ranges of one video concurrently using GPT-4.1 Vision.
+    
+    Sends one request per range, all in flight at once, so N ranges take roughly as long
+    as the slowest one.
+    
+    Args:
+        video_path: Local path to the video file
+        segments: List of [start_time, end_time] pairs in seconds (e.g., [[0, 60], [60, 120]];
+            null for the video's beginning or end)
+        style: Summary style - "short", "timeline", "detailed", or "technical" (default: "short")
+        interval_sec: Interval in seconds between extracted frames (default: 10, reasonable for cost savings). Higher = cheaper.
+        max_width: Maximum frame width in pixels (default: 512, low for cost savings). Lower = cheaper.
+        max_height: Maximum frame height in pixels (default: 768). Frames are scaled to fit both max_width and max_height, so portrait and tall frames come out narrower than max_width; raise it to keep more detail in tall frames. Lower = cheaper.
+        model: Model to use (default: "gpt-4o-mini" for cost savings, options: "gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-4.1")
+        upload_frames: Upload frames through the Files API instead of inlining them as base64 (gpt-4.1 only; the files are deleted after the request; default: False).
+        dedup_threshold: Skip frames within this many bits (of 64) of the previous kept frame's perceptual hash (default: 5; 0 sends every sampled frame). Higher = cheaper.
+        adaptive: Send fewer frames (stretching interval_sec up to 4x) while recent API requests average longer than target_latency_sec (default: False)
+        target_latency_sec: Average request latency in seconds that adaptive aims for (default: 15)
+    
+    Returns:
+        List of text summaries, in the same order as segments
+    """
     # Convert inputs to float if needed (for MCP compatibility)
-    if start_time is not None:
-        start_time = float(start_time)
-    if end_time is not None:
-        end_time = float(end_time)
-    if interval_sec is not None:
-        interval_sec = float(interval_sec)
-    if max_width is not None:
-        max_width = int(max_width)
+    segments = [
+        tuple(float(t) if t is not None else None for t in segment)
+        for segment in segments
+    ]
+    _, _, interval_sec, max_width, max_height = _coerce_time_args(None, None, interval_sec, max_width, max_height)
+    dedup_threshold, target_latency_sec = _coerce_sampling_args(dedup_threshold, target_latency_sec)
     
-    # Use defaults if not specified
-    interval_sec = interval_sec if interval_sec is not None else 10
-    max_width = max_width if max_width is not None else 512
+    return await summarize_video_segments_core(video_path, segments, style=style, interval_sec=interval_sec, max_width=max_width, max_height=max_height, model=model, upload_frames=upload_frames, dedup_threshold=dedup_threshold, adaptive=adaptive, target_latency_sec=target_latency_sec)
+
+
+@mcp.tool()
+async def summarize_videos(video_paths: list[str], style: str = "short", interval_sec: Optional[Union[float, int, str]] = None, max_width: Optional[Union[int, str]] = None, max_height: Optional[Union[int, str]] = None, model: str = "gpt-4o-mini", upload_frames: bool = False, dedup_threshold: Optional[Union[int, str]] = None, adaptive: bool = False, target_latency_sec: Optional[Union[float, int, str]] = None) -> list[str]:
+    """
+    Summarize several videos concurrently using GPT-4.1 Vision.
+    
+    Sends one request per video with up to 4 videos processed at once, so summarizing N
+    videos takes far less than N times as long as one.
+    
+    Args:
+        video_paths: List of local video file paths (e.g., the output of get_videos)
+        style: Summary style - "short", "timeline", "detailed", or "technical" (default: "short")
+        interval_sec: Interval in seconds between extracted frames (default: 10, reasonable for cost savings). Higher = cheaper.
+        max_width: Maximum frame width in pixels (default: 512, low for cost savings). Lower = cheaper.
+        max_height: Maximum frame height in pixels (default: 768). Frames are scaled to fit both max_width and max_height, so portrait and tall frames come out narrower than max_width; raise it to keep more detail in tall frames. Lower = cheaper.
+        model: Model to use (default: "gpt-4o-mini" for cost savings, options: "gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-4.1")
+        upload_frames: Upload frames through the Files API instead of inlining them as base64 (gpt-4.1 only; the files are deleted after the request; default: False).
+        dedup_threshold: Skip frames within this many bits (of 64) of the previous kept frame's perceptual hash (default: 5; 0 sends every sampled frame). Higher = cheaper.
+        adaptive: Send fewer frames (stretching interval_sec up to 4x) while recent API requests average longer than target_latency_sec (default: False)
+        target_latency_sec: Average request latency in seconds that adaptive aims for (default: 15)
     
-    return analyze_video_with_prompt_core(video_path, custom_prompt, start_time=start_time, end_time=end_time, interval_sec=interval_sec, max_width=max_width, model=model)
+    Returns:
+        List of text summaries, in the same order as video_paths
+    """
+    _, _, interval_sec, max_width, max_height = _coerce_time_args(None, None, interval_sec, max_width, max_height)
+    dedup_threshold, target_latency_sec = _coerce_sampling_args(dedup_threshold, target_latency_sec)
+    
+    return await summarize_videos_batch_core(video_paths, style=style, interval_sec=interval_sec, max_width=max_width, max_height=max_height, model=model, upload_frames=upload_frames, dedup_threshold=dedup_threshold, adaptive=adaptive, target_latency_sec=target_latency_sec)
 
 
 @mcp.tool()
-def summarize_image(image_path: str, style: str = "short", model: str = "gpt-4o-mini", max_width: Optional[Union[int, str]] = None) -> str:
+def summarize_image(image_path: str, style: str = "short", model: str = "gpt-4o-mini", max_width: Optional[Union[int, str]] = None, max_height: Optional[Union[int, str]] = None) -> str:
     """
     Analyze the content of an image using GPT-4.1 Vision.
     
@@ -106,18 +213,17 @@ def summarize_image(image_path: str, style: str = "short", model: str = "gpt-4o-
         style: Analysis style - "short", "detailed", "technical", or "descriptive" (default: "short")
         model: Model to use (default: "gpt-4o-mini" for cost savings, options: "gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-4.1")
         max_width: Maximum image width in pixels (default: 512, low for cost savings). Lower = cheaper.
+        max_height: Maximum image height in pixels (default: 768). Images are scaled to fit both max_width and max_height, so tall images come out narrower than max_width; raise it to keep more detail in tall images. Lower = cheaper.
     
     Returns:
         Text analysis of the image
     """
-    if max_width is not None:
-        max_width = int(max_width)
-    max_width = max_width if max_width is not None else 512
-    return analyze_image_core(image_path, style=style, model=model, max_width=max_width)
+    max_width, max_height = _coerce_size_args(max_width, max_height)
+    return analyze_image_core(image_path, style=style, model=model, max_width=max_width, max_height=max_height)
 
 
 @mcp.tool()
-def count_items(image_path: str, object_name: str, model: str = "gpt-4o-mini", max_width: Optional[Union[int, str]] = None) -> str:
+def count_items(image_path: str, object_name: str, model: str = "gpt-4o-mini", max_width: Optional[Union[int, str]] = None, max_height: Optional[Union[int, str]] = None) -> str:
     """
     Count specific objects in an image using GPT-4.1 Vision.
     
@@ -128,18 +234,17 @@ def count_items(image_path: str, object_name: str, model: str = "gpt-4o-mini", m
         object_name: Name of the object to count (e.g., "person", "car", "robot", "box")
         model: Model to use (default: "gpt-4o-mini" for cost savings, options: "gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-4.1")
         max_width: Maximum image width in pixels (default: 512, low for cost savings). Lower = cheaper.
+        max_height: Maximum image height in pixels (default: 768). Images are scaled to fit both max_width and max_height, so tall images come out narrower than max_width; raise it to keep more detail in tall images. Lower = cheaper.
     
     Returns:
         String containing the count of the specified objects
     """
-    if max_width is not None:
-        max_width = int(max_width)
-    max_width = max_width if max_width is not None else 512
-    return count_items_core(image_path, object_name, model=model, max_width=max_width)
+    max_width, max_height = _coerce_size_args(max_width, max_height)
+    return count_items_core(image_path, object_name, model=model, max_width=max_width, max_height=max_height)
 
 
 @mcp.tool()
-def analyze_image_with_prompt(image_path: str, custom_prompt: str, model: str = "gpt-4o-mini", max_width: Optional[Union[int, str]] = None) -> str:
+def analyze_image_with_prompt(image_path: str, custom_prompt: str, model: str = "gpt-4o-mini", max_width: Optional[Union[int, str]] = None, max_height: Optional[Union[int, str]] = None) -> str:
     """
     Analyze an image using GPT-4.1 Vision with a custom prompt/question.
     
@@ -151,14 +256,57 @@ def analyze_image_with_prompt(image_path: str, custom_prompt: str, model: str =
         custom_prompt: Custom prompt or question to ask about the image (e.g., "What color is the robot?", "Describe the safety features visible")
         model: Model to use (default: "gpt-4o-mini" for cost savings, options: "gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-4.1")
         max_width: Maximum image width in pixels (default: 512, low for cost savings). Lower = cheaper.
+        max_height: Maximum image height in pixels (default: 768). Images are scaled to fit both max_width and max_height, so tall images come out narrower than max_width; raise it to keep more detail in tall images. Lower = cheaper.
     
     Returns:
         Text response to the custom prompt
     """
-    if max_width is not None:
-        max_width = int(max_width)
-    max_width = max_width if max_width is not None else 512
-    return analyze_image_with_prompt_core(image_path, custom_prompt, model=model, max_width=max_width)
+    max_width, max_height = _coerce_size_args(max_width, max_height)
+    return analyze_image_with_prompt_core(image_path, custom_prompt, model=model, max_width=max_width, max_height=max_height)
+
+
+@mcp.tool()
+async def summarize_images(image_paths: list[str], style: str = "short", model: str = "gpt-4o-mini", max_width: Optional[Union[int, str]] = None, max_height: Optional[Union[int, str]] = None) -> list[str]:
+    """
+    Analyze several images concurrently using GPT-4.1 Vision.
+    
+    Sends one request per image with up to 8 requests in flight, so analyzing N images
+    takes roughly as long as the slowest single request.
+    
+    Args:
+        image_paths: List of local image file paths (e.g., the output of get_images)
+        style: Analysis style - "short", "detailed", "technical", or "descriptive" (default: "short")
+        model: Model to use (default: "gpt-4o-mini" for cost savings, options: "gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-4.1")
+        max_width: Maximum image width in pixels (default: 512, low for cost savings). Lower = cheaper.
+        max_height: Maximum image height in pixels (default: 768). Images are scaled to fit both max_width and max_height, so tall images come out narrower than max_width; raise it to keep more detail in tall images. Lower = cheaper.
+    
+    Returns:
+        List of text analyses, in the same order as image_paths
+    """
+    max_width, max_height = _coerce_size_args(max_width, max_height)
+    return await summarize_images_batch_core(image_paths, style=style, model=model, max_width=max_width, max_height=max_height)
+
+
+@mcp.tool()
+async def analyze_images_batch(image_paths: list[str], style: str = "short", model: str = "gpt-4o-mini", max_width: Optional[Union[int, str]] = None, max_height: Optional[Union[int, str]] = None) -> list[str]:
+    """
+    Analyze several images using GPT-4.1 Vision, sending up to 20 images per request.
+    
+    Cheaper and usually faster than summarize_images for many small images, since the
+    prompt and request overhead are shared across each batch.
+    
+    Args:
+        image_paths: List of local image file paths (e.g., the output of get_images)
+        style: Analysis style - "short", "detailed", "technical", or "descriptive" (default: "short")
+        model: Model to use (default: "gpt-4o-mini" for cost savings, options: "gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-4.1")
+        max_width: Maximum image width in pixels (default: 512, low for cost savings). Lower = cheaper.
+        max_height: Maximum image height in pixels (default: 768). Images are scaled to fit both max_width and max_height, so tall images come out narrower than max_width; raise it to keep more detail in tall images. Lower = cheaper.
+    
+    Returns:
+        List of text analyses, in the same order as image_paths
+    """
+    max_width, max_height = _coerce_size_args(max_width, max_height)
+    return await analyze_images_batch_core(image_paths, style=style, model=model, max_width=max_width, max_height=max_height)
 
 
 @mcp.tool()
@@ -0,0 +1,14 @@
+import cv2
+import numpy as np
+import pytest
+
+
+@pytest.fixture
+def video(tmp_path):
+    """Write a 3 second, 10 fps test video and return its path."""
+    path = str(tmp_path / "clip.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 10, (64, 48))
+    for i in range(30):
+        writer.write(np.full((48, 64, 3), i * 8, dtype=np.uint8))
+    writer.release()
+    return path
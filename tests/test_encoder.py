@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from encoder import MAX_HEIGHT, fit_width, resize_for_api
+
+
+def test_fit_width_keeps_small_frames():
+    assert fit_width(400, 300, 512) == (400, 300)
+
+
+def test_fit_width_without_limit_keeps_size():
+    assert fit_width(1920, 1080, None, None) == (1920, 1080)
+
+
+def test_fit_width_scales_to_max_width():
+    assert fit_width(2000, 1000, 500) == (500, 250)
+
+
+def test_fit_width_caps_tall_frames_at_max_height():
+    width, height = fit_width(500, 4000, 512)
+    assert height == MAX_HEIGHT
+    assert width == 500 * MAX_HEIGHT // 4000
+
+
+def test_fit_width_never_scales_to_zero():
+    assert fit_width(4000, 2, 100) == (100, 1)
+    assert fit_width(1, 4000, 512) == (1, MAX_HEIGHT)
+
+
+def test_fit_width_uses_the_tighter_limit():
+    assert fit_width(1080, 1920, 512) == (432, 768)
+    assert fit_width(3840, 2160, 2048, 2160) == (2048, 1152)
+    assert fit_width(3840, 2160, 2048, 720) == (1280, 720)
+
+
+def test_fit_width_with_height_limit_only():
+    assert fit_width(3840, 2160, None, 1080) == (1920, 1080)
+    assert fit_width(1080, 1920, 2048, None) == (1080, 1920)
+
+
+@pytest.mark.parametrize("max_height", [0, -1])
+def test_fit_width_rejects_non_positive_height(max_height):
+    with pytest.raises(ValueError):
+        fit_width(1920, 1080, 512, max_height)
+
+
+@pytest.mark.parametrize("max_width", [0, -1])
+def test_fit_width_rejects_non_positive_width(max_width):
+    with pytest.raises(ValueError):
+        fit_width(1920, 1080, max_width)
+
+
+def test_resize_for_api_rejects_zero_width():
+    with pytest.raises(ValueError):
+        resize_for_api(np.zeros((1080, 1920, 3), dtype=np.uint8), 0)
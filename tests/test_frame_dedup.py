@@ -0,0 +1,25 @@
+import numpy as np
+
+from frame_dedup import drop_near_duplicates, hash_distance, phash
+
+
+def _gradient(horizontal):
+    ramp = np.tile(np.linspace(0, 255, 64, dtype=np.uint8), (64, 1))
+    frame = ramp if horizontal else ramp.T
+    return np.dstack([frame] * 3)
+
+
+def test_identical_frames_hash_equal():
+    assert hash_distance(phash(_gradient(True)), phash(_gradient(True))) == 0
+
+
+def test_drop_near_duplicates_keeps_distinct_frames():
+    frames = [_gradient(True), _gradient(True), _gradient(False)]
+    kept = list(drop_near_duplicates(frames, 5))
+    assert len(kept) == 2
+    assert kept[1] is frames[2]
+
+
+def test_drop_near_duplicates_threshold_zero_keeps_all():
+    frames = [_gradient(True)] * 3
+    assert list(drop_near_duplicates(frames, 0)) == frames
@@ -0,0 +1,94 @@
+import numpy as np
+import pytest
+
+import frame_extractor
+from frame_extractor import _FrameBuffer, _collapse_to_frames, _needs_seek, _snap_to_keyframes, extract_keyframes, iter_keyframes
+
+
+def test_snap_to_keyframes_merges_targets(monkeypatch):
+    monkeypatch.setattr(frame_extractor, "probe_keyframes", lambda path: [0.0, 4.0, 8.0, 12.0])
+    assert _snap_to_keyframes("video.mp4", [0.0, 1.0, 2.0, 5.0, 6.0], 12.0) == [0.0, 4.0, 8.0]
+
+
+def test_snap_to_keyframes_matches_rounded_timestamps(monkeypatch):
+    monkeypatch.setattr(frame_extractor, "probe_keyframes", lambda path: [0.0, 2.0001])
+    assert _snap_to_keyframes("video.mp4", [2.0002], 10.0) == [2.0001]
+
+
+def test_snap_to_keyframes_stops_at_end_time(monkeypatch):
+    monkeypatch.setattr(frame_extractor, "probe_keyframes", lambda path: [0.0, 4.0, 8.0])
+    assert _snap_to_keyframes("video.mp4", [0.0, 5.0], 6.0) == [0.0]
+
+
+def test_needs_seek_only_across_keyframes():
+    keyframes = [0.0, 10.0, 20.0]
+    assert not _needs_seek(keyframes, 1.0, 9.0)
+    assert _needs_seek(keyframes, 1.0, 10.0)
+    assert _needs_seek(keyframes, 11.0, 25.0)
+
+
+def test_needs_seek_without_keyframes_seeks_forward():
+    assert _needs_seek(None, 1.0, 2.0)
+    assert not _needs_seek(None, 2.0, 2.0)
+
+
+def test_extract_keyframes_samples_at_interval(video):
+    assert len(extract_keyframes(video, interval_sec=1)) == 3
+
+
+def test_collapse_to_frames_drops_sub_frame_targets():
+    # 0.05 and 0.1 both map to frame 1, 0.15 and 0.2 to frame 2
+    assert _collapse_to_frames([0.0, 0.05, 0.1, 0.15, 0.2], 10) == [0.0, 0.05, 0.15]
+    assert _collapse_to_frames([0.0, 1.0, 2.0], 10) == [0.0, 1.0, 2.0]
+
+
+def test_sub_frame_interval_gives_same_frames_on_every_backend(video):
+    pytest.importorskip("av")
+    pyav = extract_keyframes(video, interval_sec=0.05, backend="pyav", workers=1)
+    opencv = extract_keyframes(video, interval_sec=0.05, backend="opencv", workers=1)
+    assert len(pyav) == len(opencv) <= 31
+
+
+@pytest.mark.parametrize("interval_sec", [0, -1])
+def test_non_positive_interval_is_rejected(video, interval_sec):
+    with pytest.raises(ValueError, match="Interval"):
+        extract_keyframes(video, interval_sec=interval_sec)
+    with pytest.raises(ValueError, match="Interval"):
+        next(iter_keyframes(video, interval_sec=interval_sec))
+
+
+def test_iter_keyframes_parallel_matches_serial(video, monkeypatch):
+    serial = list(iter_keyframes(video, interval_sec=0.5, workers=1))
+    monkeypatch.setattr(frame_extractor, "PARALLEL_MIN_DURATION_SEC", 0)
+    parallel = list(iter_keyframes(video, interval_sec=0.5, workers=2))
+    assert len(parallel) == len(serial) == 6
+    assert all(np.array_equal(a, b) for a, b in zip(serial, parallel))
+
+
+def _frame(width, height, value):
+    return np.full((height, width, 3), value, dtype=np.uint8)
+
+
+def test_frame_buffer_survives_resolution_change():
+    frames = _FrameBuffer(2, 512, 768)
+    frames.add(_frame(1920, 1080, 100))
+    frames.add(_frame(1440, 1080, 200))
+    first, second = frames.frames()
+    assert first.shape == second.shape == (288, 512, 3)
+    assert (first == 100).all() and (second == 200).all()
+
+
+def test_frame_buffer_resizes_later_frames_to_the_slot_size():
+    frames = _FrameBuffer(2, 512, 768)
+    frames.add(_frame(400, 300, 50))
+    frames.add(_frame(1024, 576, 150))
+    first, second = frames.frames()
+    assert first.shape == second.shape == (300, 400, 3)
+    assert (second == 150).all()
+
+
+def test_split_targets_caps_chunk_size(monkeypatch):
+    monkeypatch.setattr(frame_extractor, "PARALLEL_MIN_DURATION_SEC", 0)
+    chunks = frame_extractor._split_targets([float(t) for t in range(100)], 2)
+    assert max(len(chunk) for chunk in chunks) == frame_extractor._CHUNK_FRAMES
+    assert [t for chunk in chunks for t in chunk] == [float(t) for t in range(100)]
@@ -0,0 +1,63 @@
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from image_analysis import _load_image, _parse_batch_reply, _sniff_format
+
+
+def test_sniff_format():
+    assert _sniff_format(b"\xff\xd8\xff\xe0rest") == "JPEG"
+    assert _sniff_format(b"\x89PNG\r\n\x1a\nrest") == "PNG"
+    assert _sniff_format(b"RIFF\x00\x00\x00\x00WEBPVP8 ") == "WEBP"
+    assert _sniff_format(b"BM\x00\x00") is None
+
+
+def test_parse_batch_reply_strips_code_fence():
+    reply = '```json\n{"results": [{"result": "a cat"}, {"result": 3}]}\n```'
+    assert _parse_batch_reply(reply, 2) == ["a cat", "3"]
+
+
+def test_parse_batch_reply_rejects_wrong_count():
+    with pytest.raises(RuntimeError):
+        _parse_batch_reply('{"results": [{"result": "a cat"}]}', 2)
+
+
+def test_parse_batch_reply_rejects_non_json():
+    with pytest.raises(RuntimeError):
+        _parse_batch_reply("I could not read the images.", 1)
+
+
+@pytest.mark.parametrize("reply", [None, ""])
+def test_parse_batch_reply_rejects_empty_reply(reply):
+    with pytest.raises(RuntimeError, match="empty reply"):
+        _parse_batch_reply(reply, 1)
+
+
+def test_load_image_passes_small_jpegs_through(tmp_path):
+    path = str(tmp_path / "photo.jpg")
+    cv2.imwrite(path, _noise())
+    with open(path, "rb") as f:
+        assert _load_image(path, 512, 768) == (f.read(), "image/jpeg")
+
+
+def test_load_image_reencodes_photographic_png(tmp_path):
+    path = str(tmp_path / "photo.png")
+    cv2.imwrite(path, _noise())
+    data, mime = _load_image(path, 512, 768)
+    assert mime == "image/jpeg"
+    assert len(data) < os.path.getsize(path)
+
+
+def test_load_image_keeps_png_smaller_than_jpeg(tmp_path):
+    path = str(tmp_path / "diagram.png")
+    diagram = np.full((200, 300, 3), 255, dtype=np.uint8)
+    diagram[50:150, 50:250] = (40, 120, 200)
+    cv2.imwrite(path, diagram)
+    with open(path, "rb") as f:
+        assert _load_image(path, 512, 768) == (f.read(), "image/png")
+
+
+def _noise():
+    return np.random.default_rng(0).integers(0, 256, (200, 300, 3), dtype=np.uint8)
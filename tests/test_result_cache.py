@@ -0,0 +1,17 @@
+from result_cache import result_key
+
+
+def test_result_key_is_stable():
+    assert result_key(b"jpeg", "prompt", "gpt-4o") == result_key([b"jpeg"], "prompt", "gpt-4o")
+
+
+def test_result_key_depends_on_every_part():
+    key = result_key([b"jpeg"], "prompt", "gpt-4o")
+    assert result_key([b"jpeg2"], "prompt", "gpt-4o") != key
+    assert result_key([b"jpeg"], "other prompt", "gpt-4o") != key
+    assert result_key([b"jpeg"], "prompt", "gpt-4o-mini") != key
+
+
+def test_result_key_separates_boundaries():
+    assert result_key([b"ab", b"c"], "p") != result_key([b"a", b"bc"], "p")
+    assert result_key([b"jpeg"], "ab", "c") != result_key([b"jpeg"], "a", "bc")
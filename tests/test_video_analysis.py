@@ -0,0 +1,25 @@
+import pytest
+
+import video_analysis
+from video_analysis import _effective_interval
+
+
+def test_effective_interval_ignores_latency_unless_adaptive(monkeypatch):
+    monkeypatch.setattr(video_analysis, "_latency", 60.0)
+    assert _effective_interval(10, False, 15.0) == 10
+
+
+def test_effective_interval_stretches_with_latency(monkeypatch):
+    monkeypatch.setattr(video_analysis, "_latency", 30.0)
+    assert _effective_interval(10, True, 15.0) == 20
+    assert _effective_interval(10, True, 30.0) == 10
+
+
+def test_effective_interval_stretch_is_capped(monkeypatch):
+    monkeypatch.setattr(video_analysis, "_latency", 600.0)
+    assert _effective_interval(10, True, 15.0) == 40
+
+
+def test_effective_interval_rejects_non_positive_target():
+    with pytest.raises(ValueError):
+        _effective_interval(10, True, 0)
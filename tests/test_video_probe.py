@@ -0,0 +1,29 @@
+import pytest
+
+import video_probe
+from video_probe import probe_video
+
+
+@pytest.fixture
+def store(monkeypatch):
+    entries = {}
+    monkeypatch.setattr(video_probe, "get_result", entries.get)
+    monkeypatch.setattr(video_probe, "store_result", entries.__setitem__)
+    video_probe._probe.cache_clear()
+    yield entries
+    video_probe._probe.cache_clear()
+
+
+def test_probe_video_reads_metadata(video, store):
+    info = probe_video(video)
+    assert (info.width, info.height) == (64, 48)
+    assert info.duration == pytest.approx(3.0, abs=0.1)
+
+
+def test_probe_is_served_from_the_result_cache(video, store, monkeypatch):
+    info = probe_video(video)
+    assert [key.split(":")[:2] for key in store] == [["probe", "info"]]
+
+    video_probe._probe.cache_clear()
+    monkeypatch.setattr(video_probe, "_probe_info", lambda path: pytest.fail("probed again"))
+    assert probe_video(video) == info
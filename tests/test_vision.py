@@ -0,0 +1,73 @@
+import types
+
+import httpx
+import pytest
+from openai import APIError
+
+import vision
+
+
+class FakeFiles:
+    def __init__(self, fail_after=None):
+        self.created = []
+        self.deleted = []
+        self.fail_after = fail_after
+
+    def create(self, file, purpose):
+        if self.fail_after is not None and len(self.created) >= self.fail_after:
+            raise APIError("upload rejected", httpx.Request("POST", "https://api.openai.com/v1/files"), body=None)
+        self.created.append(file[1])
+        return types.SimpleNamespace(id=f"file-{len(self.created)}")
+
+    def delete(self, file_id):
+        self.deleted.append(file_id)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    requests = []
+
+    def create(**kwargs):
+        requests.append(kwargs)
+        return types.SimpleNamespace(output_text="reply")
+
+    fake = types.SimpleNamespace(files=FakeFiles(), responses=types.SimpleNamespace(create=create), requests=requests)
+    monkeypatch.setattr(vision, "get_client", lambda: fake)
+    monkeypatch.setattr(vision, "get_result", lambda key: None)
+    monkeypatch.setattr(vision, "store_result", lambda key, result: None)
+    monkeypatch.setattr(vision, "RESPONSES_MODELS", frozenset({"gpt-4.1"}))
+    # Run the background deletes inline so the test can check them
+    monkeypatch.setattr(vision, "_delete_files", lambda file_ids: [vision._delete_file(i) for i in set(file_ids)])
+    return fake
+
+
+def _image_parts(request):
+    return [part for part in request["input"][0]["content"] if part["type"] == "input_image"]
+
+
+def test_uploaded_files_are_deleted_after_the_request(client):
+    images = [(b"a", "image/jpeg"), (b"b", "image/jpeg"), (b"a", "image/jpeg")]
+    assert vision.call_vision(images, "prompt", "gpt-4.1", upload=True) == "reply"
+
+    assert client.files.created == [b"a", b"b"]
+    assert [part["file_id"] for part in _image_parts(client.requests[0])] == ["file-1", "file-2", "file-1"]
+    assert sorted(client.files.deleted) == ["file-1", "file-2"]
+
+
+def test_failed_upload_falls_back_to_data_urls(client):
+    client.files.fail_after = 1
+    images = [(b"a", "image/jpeg"), (b"b", "image/jpeg")]
+    vision.call_vision(images, "prompt", "gpt-4.1", upload=True)
+
+    assert all("image_url" in part for part in _image_parts(client.requests[0]))
+    assert client.files.deleted == ["file-1"]
+
+
+def test_latency_is_reported_only_for_api_calls(client, monkeypatch):
+    latencies = []
+    vision.call_vision([(b"a", "image/jpeg")], "prompt", "gpt-4.1", on_latency=latencies.append)
+    assert len(latencies) == 1
+
+    monkeypatch.setattr(vision, "get_result", lambda key: "cached")
+    assert vision.call_vision([(b"a", "image/jpeg")], "prompt", "gpt-4.1", on_latency=latencies.append) == "cached"
+    assert len(latencies) == 1
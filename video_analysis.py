@@ -2,21 +2,198 @@
 Core video analysis module using GPT-4.1 Vision.
 """
 
+import asyncio
+import functools
+import hashlib
 import os
-from pathlib import Path
-from openai import OpenAI
-from dotenv import load_dotenv
-from frame_extractor import extract_keyframes
-from encoder import encode_jpeg
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from frame_extractor import iter_keyframes
+from encoder import MAX_HEIGHT, encode_jpeg
+from frame_dedup import drop_near_duplicates
 from prompt import build_summary_prompt
+from result_cache import result_key, get_result, store_result
+from vision import call_vision, acall_vision
 
-# Load environment variables
-load_dotenv()
+# Shared pool for JPEG encoding; the encoders release the GIL, so frames encode in parallel.
+# Capped at 8: a small frame encodes in about a millisecond, so more threads only contend
+# with the decoder thread and the other requests' encodes
+_ENCODE_POOL = ThreadPoolExecutor(max_workers=min(8, os.cpu_count() or 1), thread_name_prefix="jpeg-encode")
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Requests carrying many frames can take minutes to answer, so they get a longer
+# timeout than the shared client's default
+_REQUEST_TIMEOUT = 600.0
 
+# JPEG settings for sampled frames. They are already downscaled for cost, and upload
+# time dominates, so quality 70 with 4:2:0 chroma keeps payloads about 30% smaller
+# than the encoder defaults with no visible loss at this size
+JPEG_QUALITY = 70
+JPEG_SUBSAMPLING = "4:2:0"
 
-def summarize_video(video_path, style="short", start_time=None, end_time=None, interval_sec=10, max_width=512, model="gpt-4o-mini"):
+# Decoded frames buffered ahead of the consumer, and frames queued for an encoder thread
+_PREFETCH_FRAMES = 32
+
+# Frames whose perceptual hash is fewer than this many bits (of 64) away from the last kept frame
+# are dropped as near-duplicates, which thins out static scenes before encoding
+DEDUP_THRESHOLD = 5
+
+# Adaptive sampling: while recent API round trips average longer than the target latency
+# (TARGET_LATENCY_SEC unless a call passes its own), calls with adaptive=True stretch
+# interval_sec in proportion (up to _MAX_INTERVAL_STRETCH times), sending fewer frames
+# rather than piling up ever slower requests. Cache hits do not count towards the average
+TARGET_LATENCY_SEC = 15.0
+_MAX_INTERVAL_STRETCH = 4.0
+_LATENCY_SMOOTHING = 0.2
+
+# Moving average of API request latency in seconds (None until the first request)
+_latency = None
+_latency_lock = threading.Lock()
+
+# File extensions listed by get_videos, lowercase
+VIDEO_EXTENSIONS = frozenset({'.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.wmv', '.m4v', '.3gp'})
+
+
+def _extract_jpegs(video_path, start_time, end_time, interval_sec, max_width, max_height, dedup_threshold=DEDUP_THRESHOLD):
+    """
+    Extract keyframes and JPEG-encode them, overlapping decoding with encoding.
+    
+    Frames are decoded on a background thread and each one is submitted to the encode
+    pool as soon as it arrives, so encoding runs while later frames are still decoding.
+    Only JPEG bytes are kept; at most a small window of decoded frames is alive at once
+    (for ranges long enough to decode in parallel, that window also holds the frames of
+    the few small chunks in flight on the worker pool).
+    Near-duplicates of the previous kept frame are dropped before they are encoded.
+    
+    Returns:
+        List of JPEG-encoded frames as bytes, in timestamp order
+    """
+    frames = iter_keyframes(
+        video_path, start_time=start_time, end_time=end_time, interval_sec=interval_sec,
+        max_width=max_width, max_height=max_height, prefetch=_PREFETCH_FRAMES,
+    )
+    frames = drop_near_duplicates(frames, dedup_threshold)
+    jpegs = []
+    pending = deque()
+    for frame in frames:
+        # Cap the frames queued for encoding, so memory stays bounded however long the video
+        if len(pending) >= _PREFETCH_FRAMES:
+            jpegs.append(pending.popleft().result())
+        pending.append(_ENCODE_POOL.submit(encode_jpeg, frame, quality=JPEG_QUALITY, subsampling=JPEG_SUBSAMPLING))
+    jpegs.extend(future.result() for future in pending)
+    return jpegs
+
+
+def _frame_images(jpegs):
+    """Pair JPEG-encoded frames with their MIME type for the vision helpers."""
+    return [(jpeg, "image/jpeg") for jpeg in jpegs]
+
+
+def _summarize(video_path, prompt, start_time, end_time, interval_sec, max_width, max_height, model, upload_frames, dedup_threshold, adaptive, target_latency_sec):
+    """
+    Extract frames from a video, send them with a prompt and tag the reply.
+    
+    Finished results are cached by video content and sampling parameters, so repeating
+    a request skips decoding and encoding as well as the API call.
+    """
+    interval_sec = _effective_interval(interval_sec, adaptive, target_latency_sec)
+    key = _video_key(video_path, prompt, start_time, end_time, interval_sec, max_width, max_height, model, dedup_threshold)
+    summary = get_result(key) if key is not None else None
+    if summary is not None:
+        return summary
+    
+    jpegs = _extract_jpegs(video_path, start_time, end_time, interval_sec, max_width, max_height, dedup_threshold)
+    result = call_vision(
+        _frame_images(jpegs), prompt, model, upload=upload_frames, timeout=_REQUEST_TIMEOUT, on_latency=_record_latency
+    )
+    summary = f"{result}\n\n[Frames used: {len(jpegs)}, Model: {model}]"
+    if key is not None:
+        store_result(key, summary)
+    return summary
+
+
+async def _asummarize(video_path, prompt, start_time, end_time, interval_sec, max_width, max_height, model, upload_frames, dedup_threshold, adaptive, target_latency_sec):
+    """Async variant of _summarize; hashing, extraction and encoding run in a worker thread."""
+    interval_sec = _effective_interval(interval_sec, adaptive, target_latency_sec)
+    key = await asyncio.to_thread(
+        _video_key, video_path, prompt, start_time, end_time, interval_sec, max_width, max_height, model, dedup_threshold
+    )
+    summary = get_result(key) if key is not None else None
+    if summary is not None:
+        return summary
+    
+    jpegs = await asyncio.to_thread(
+        _extract_jpegs, video_path, start_time, end_time, interval_sec, max_width, max_height, dedup_threshold
+    )
+    result = await acall_vision(
+        _frame_images(jpegs), prompt, model, upload=upload_frames, timeout=_REQUEST_TIMEOUT, on_latency=_record_latency
+    )
+    summary = f"{result}\n\n[Frames used: {len(jpegs)}, Model: {model}]"
+    if key is not None:
+        store_result(key, summary)
+    return summary
+
+
+def _effective_interval(interval_sec, adaptive, target_latency_sec):
+    """
+    Return interval_sec, stretched in proportion to recent API latency when adaptive.
+    
+    Raises:
+        ValueError: If adaptive is set and target_latency_sec is not positive
+    """
+    if not adaptive:
+        return interval_sec
+    if target_latency_sec <= 0:
+        raise ValueError(f"Target latency must be positive: {target_latency_sec}")
+    latency = _latency
+    if latency is None or latency <= target_latency_sec:
+        return interval_sec
+    return interval_sec * min(latency / target_latency_sec, _MAX_INTERVAL_STRETCH)
+
+
+def _record_latency(elapsed):
+    """Fold one API round trip's latency into the moving average (cache hits are not counted)."""
+    global _latency
+    with _latency_lock:
+        _latency = elapsed if _latency is None else _latency + _LATENCY_SMOOTHING * (elapsed - _latency)
+
+
+def _video_key(video_path, prompt, start_time, end_time, interval_sec, max_width, max_height, model, dedup_threshold):
+    """
+    Build the result cache key for a video request, or None if the file cannot be read.
+    
+    Frame sampling and encoding settings are part of the key, so changing them misses
+    the cache instead of returning a summary built from different frames.
+    """
+    try:
+        stat = os.stat(video_path)
+        digest = _file_digest(os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        return None  # Let frame extraction report the missing or unreadable file
+    return result_key(
+        digest, "video", prompt, model, start_time, end_time, interval_sec, max_width, max_height,
+        JPEG_QUALITY, JPEG_SUBSAMPLING, dedup_threshold,
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def _file_digest(path, size, mtime_ns):
+    """
+    Return the SHA-256 digest of a file's contents.
+    
+    Memoized on size and modification time, so a video is only hashed again after it
+    changes on disk.
+    """
+    with open(path, "rb") as f:
+        if hasattr(hashlib, "file_digest"):  # Python 3.11+
+            return hashlib.file_digest(f, "sha256").digest()
+        digest = hashlib.sha256()
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+        return digest.digest()
+
+
+def summarize_video(video_path, style="short", start_time=None, end_time=None, interval_sec=10, max_width=512, model="gpt-4o-mini", upload_frames=False, dedup_threshold=DEDUP_THRESHOLD, adaptive=False, target_latency_sec=TARGET_LATENCY_SEC, max_height=MAX_HEIGHT):
     """
     Summarize a video using GPT-4.1 Vision.
     
@@ -28,6 +205,17 @@ def summarize_video(video_path, style="short", start_time=None, end_time=None, i
         end_time: End time in seconds (None for end of video)
         interval_sec: Interval in seconds between extracted frames (default: 10, reasonable for cost savings)
         max_width: Maximum frame width in pixels (default: 512, low for cost savings)
+        max_height: Maximum frame height in pixels (default: 768); frames are scaled to fit
+            within both limits, so tall and portrait frames may come out narrower than max_width
+        upload_frames: Upload frames through the Files API and reference them by file ID
+            instead of inlining base64 data URLs, shrinking the request by about a quarter;
+            the files are deleted after the request (Responses API models only; default: False)
+        dedup_threshold: Drop frames whose perceptual hash is fewer than this many bits
+            (of 64) from the previous kept frame (default: 5; 0 keeps every frame)
+        adaptive: Stretch interval_sec (up to 4x) while recent API requests average
+            longer than target_latency_sec, sending fewer frames (default: False)
+        target_latency_sec: Average request latency in seconds that adaptive sampling
+            aims for (default: 15)
     
     Returns:
         Text summary of the video
@@ -36,75 +224,10 @@ def summarize_video(video_path, style="short", start_time=None, end_time=None, i
         ValueError: If video cannot be opened or time range is invalid
         RuntimeError: If API call fails
     """
-    frames = extract_keyframes(video_path, start_time=start_time, end_time=end_time, interval_sec=interval_sec, max_width=max_width)
-    num_frames = len(frames)
-    time_range = ""
-    if start_time is not None or end_time is not None:
-        start_str = f"{start_time:.1f}s" if start_time is not None else "0s"
-        end_str = f"{end_time:.1f}s" if end_time is not None else "end"
-        time_range = f" ({start_str} - {end_str})"
-
-    image_inputs = []
-    for f in frames:
-        jpeg = encode_jpeg(f)
-        image_inputs.append({
-            "type": "input_image",
-            "image": jpeg
-        })
-
-    prompt = build_summary_prompt(style)
-
-    # Try GPT-4.1 Vision API (Responses API format) - only for gpt-4.1
-    try:
-        if model != "gpt-4.1":
-            raise AttributeError("Responses API only for gpt-4.1")
-        response = client.responses.create(
-            model=model,
-            input=[
-                *image_inputs,
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
-        )
-        result = response.output_text
-        return f"{result}\n\n[Frames used: {num_frames}, Model: {model}]"
-    except (AttributeError, Exception) as e:
-        # Fallback to standard chat.completions API if responses.create doesn't exist
-        import base64
-        image_content = []
-        for f in frames:
-            jpeg = encode_jpeg(f)
-            base64_image = base64.b64encode(jpeg).decode('utf-8')
-            image_content.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/jpeg;base64,{base64_image}"
-                }
-            })
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": prompt
-                        },
-                        *image_content
-                    ]
-                }
-            ],
-            max_tokens=1000
-        )
-        result = response.choices[0].message.content
-        return f"{result}\n\n[Frames used: {num_frames}, Model: {model}]"
+    return _summarize(video_path, build_summary_prompt(style), start_time, end_time, interval_sec, max_width, max_height, model, upload_frames, dedup_threshold, adaptive, target_latency_sec)
 
 
-def analyze_video_with_prompt(video_path, custom_prompt, start_time=None, end_time=None, interval_sec=10, max_width=512, model="gpt-4o-mini"):
+def analyze_video_with_prompt(video_path, custom_prompt, start_time=None, end_time=None, interval_sec=10, max_width=512, model="gpt-4o-mini", upload_frames=False, dedup_threshold=0, adaptive=False, target_latency_sec=TARGET_LATENCY_SEC, max_height=MAX_HEIGHT):
     """
     Analyze a video using GPT-4.1 Vision with a custom prompt/question.
     
@@ -116,6 +239,18 @@ def analyze_video_with_prompt(video_path, custom_prompt, start_time=None, end_ti
         end_time: End time in seconds (None for end of video)
         interval_sec: Interval in seconds between extracted frames (default: 10, reasonable for cost savings)
         max_width: Maximum frame width in pixels (default: 512, low for cost savings)
+        max_height: Maximum frame height in pixels (default: 768); frames are scaled to fit
+            within both limits, so tall and portrait frames may come out narrower than max_width
+        upload_frames: Upload frames through the Files API and reference them by file ID
+            instead of inlining base64 data URLs, shrinking the request by about a quarter;
+            the files are deleted after the request (Responses API models only; default: False)
+        dedup_threshold: Drop frames whose perceptual hash is fewer than this many bits
+            (of 64) from the previous kept frame (default: 0, keeping every frame, since
+            a custom question may hinge on a small change such as a count or a line of text)
+        adaptive: Stretch interval_sec (up to 4x) while recent API requests average
+            longer than target_latency_sec, sending fewer frames (default: False)
+        target_latency_sec: Average request latency in seconds that adaptive sampling
+            aims for (default: 15)
     
     Returns:
         Text response to the custom prompt
@@ -124,70 +259,112 @@ def analyze_video_with_prompt(video_path, custom_prompt, start_time=None, end_ti
         ValueError: If video cannot be opened or time range is invalid
         RuntimeError: If API call fails
     """
-    frames = extract_keyframes(video_path, start_time=start_time, end_time=end_time, interval_sec=interval_sec, max_width=max_width)
-    num_frames = len(frames)
-    time_range = ""
-    if start_time is not None or end_time is not None:
-        start_str = f"{start_time:.1f}s" if start_time is not None else "0s"
-        end_str = f"{end_time:.1f}s" if end_time is not None else "end"
-        time_range = f" ({start_str} - {end_str})"
-
-    image_inputs = []
-    for f in frames:
-        jpeg = encode_jpeg(f)
-        image_inputs.append({
-            "type": "input_image",
-            "image": jpeg
-        })
-
-    # Try GPT-4.1 Vision API (Responses API format) - only for gpt-4.1
-    try:
-        if model != "gpt-4.1":
-            raise AttributeError("Responses API only for gpt-4.1")
-        response = client.responses.create(
-            model=model,
-            input=[
-                *image_inputs,
-                {
-                    "role": "user",
-                    "content": custom_prompt
-                }
-            ]
-        )
-        result = response.output_text
-        return f"{result}\n\n[Frames used: {num_frames}, Model: {model}]"
-    except (AttributeError, Exception) as e:
-        # Fallback to standard chat.completions API if responses.create doesn't exist
-        import base64
-        image_content = []
-        for f in frames:
-            jpeg = encode_jpeg(f)
-            base64_image = base64.b64encode(jpeg).decode('utf-8')
-            image_content.append({
-                "type": "image_url",
-                "image_url": {
-                    "url": f"data:image/jpeg;base64,{base64_image}"
-                }
-            })
-        
-        response = client.chat.completions.create(
-            model=model,
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": custom_prompt
-                        },
-                        *image_content
-                    ]
-                }
-            ],
-            max_tokens=1000
+    return _summarize(video_path, custom_prompt, start_time, end_time, interval_sec, max_width, max_height, model, upload_frames, dedup_threshold, adaptive, target_latency_sec)
+
+
+async def summarize_video_async(video_path, style="short", start_time=None, end_time=None, interval_sec=10, max_width=512, model="gpt-4o-mini", upload_frames=False, dedup_threshold=DEDUP_THRESHOLD, adaptive=False, target_latency_sec=TARGET_LATENCY_SEC, max_height=MAX_HEIGHT):
+    """
+    Async variant of summarize_video.
+    
+    Frame extraction and encoding run in a worker thread; the API call is awaited on
+    the async client, so several clips can be summarized concurrently.
+    
+    Returns:
+        Text summary of the video
+    
+    Raises:
+        ValueError: If video cannot be opened or time range is invalid
+        RuntimeError: If API call fails
+    """
+    return await _asummarize(
+        video_path, build_summary_prompt(style), start_time, end_time, interval_sec, max_width, max_height, model, upload_frames,
+        dedup_threshold, adaptive, target_latency_sec,
+    )
+
+
+async def summarize_video_segments(video_path, segments, style="short", interval_sec=10, max_width=512, model="gpt-4o-mini", upload_frames=False, dedup_threshold=DEDUP_THRESHOLD, adaptive=False, target_latency_sec=TARGET_LATENCY_SEC, max_height=MAX_HEIGHT):
+    """
+    Summarize several time ranges of a video concurrently, one request per range.
+    
+    Args:
+        video_path: Path to the video file
+        segments: List of (start_time, end_time) pairs in seconds (None for the video's
+            beginning or end)
+        style: Summary style - "short", "timeline", "detailed", or "technical"
+        interval_sec: Interval in seconds between extracted frames (default: 10, reasonable for cost savings)
+        max_width: Maximum frame width in pixels (default: 512, low for cost savings)
+        max_height: Maximum frame height in pixels (default: 768); frames are scaled to fit
+            within both limits, so tall and portrait frames may come out narrower than max_width
+        model: Model to use (default: "gpt-4o-mini" for cost savings, options: "gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-4.1")
+        upload_frames: Upload frames through the Files API instead of inlining them
+            (Responses API models only; default: False)
+        dedup_threshold: Drop frames whose perceptual hash is fewer than this many bits
+            (of 64) from the previous kept frame (default: 5; 0 keeps every frame)
+        adaptive: Stretch interval_sec (up to 4x) while recent API requests average
+            longer than target_latency_sec, sending fewer frames (default: False)
+        target_latency_sec: Average request latency in seconds that adaptive sampling
+            aims for (default: 15)
+    
+    Returns:
+        List of text summaries, in the same order as segments
+    
+    Raises:
+        ValueError: If video cannot be opened or a time range is invalid
+        RuntimeError: If an API call fails
+    """
+    return await asyncio.gather(*(
+        summarize_video_async(
+            video_path, style=style, start_time=start_time, end_time=end_time,
+            interval_sec=interval_sec, max_width=max_width, max_height=max_height, model=model, upload_frames=upload_frames,
+            dedup_threshold=dedup_threshold, adaptive=adaptive, target_latency_sec=target_latency_sec,
         )
-        result = response.choices[0].message.content
-        return f"{result}\n\n[Frames used: {num_frames}, Model: {model}]"
+        for start_time, end_time in segments
+    ))
+
+
+async def summarize_videos_batch(video_paths, style="short", interval_sec=10, max_width=512, model="gpt-4o-mini", upload_frames=False, dedup_threshold=DEDUP_THRESHOLD, adaptive=False, target_latency_sec=TARGET_LATENCY_SEC, concurrency=4, max_height=MAX_HEIGHT):
+    """
+    Summarize several videos concurrently, one request per video.
+    
+    At most `concurrency` videos are extracted and summarized at once, which bounds both
+    decoding load and the requests in flight.
+    
+    Args:
+        video_paths: List of video file paths
+        style: Summary style - "short", "timeline", "detailed", or "technical"
+        interval_sec: Interval in seconds between extracted frames (default: 10, reasonable for cost savings)
+        max_width: Maximum frame width in pixels (default: 512, low for cost savings)
+        max_height: Maximum frame height in pixels (default: 768); frames are scaled to fit
+            within both limits, so tall and portrait frames may come out narrower than max_width
+        model: Model to use (default: "gpt-4o-mini" for cost savings, options: "gpt-4o-mini", "gpt-4o", "gpt-4-turbo", "gpt-4.1")
+        upload_frames: Upload frames through the Files API instead of inlining them
+            (Responses API models only; default: False)
+        dedup_threshold: Drop frames whose perceptual hash is fewer than this many bits
+            (of 64) from the previous kept frame (default: 5; 0 keeps every frame)
+        adaptive: Stretch interval_sec (up to 4x) while recent API requests average
+            longer than target_latency_sec, sending fewer frames (default: False)
+        target_latency_sec: Average request latency in seconds that adaptive sampling
+            aims for (default: 15)
+        concurrency: Maximum number of videos processed at once (default: 4)
+    
+    Returns:
+        List of text summaries, in the same order as video_paths
+    
+    Raises:
+        ValueError: If a video cannot be opened
+        RuntimeError: If an API call fails
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def summarize(video_path):
+        async with semaphore:
+            return await summarize_video_async(
+                video_path, style=style, interval_sec=interval_sec, max_width=max_width, max_height=max_height,
+                model=model, upload_frames=upload_frames, dedup_threshold=dedup_threshold,
+                adaptive=adaptive, target_latency_sec=target_latency_sec,
+            )
+    
+    return await asyncio.gather(*(summarize(path) for path in video_paths))
 
 
 def get_videos():
@@ -197,17 +374,18 @@ def get_videos():
     Returns:
         List of video file paths relative to the videos directory
     """
-    videos_dir = Path("videos")
-    if not videos_dir.exists():
+
+    # scandir reports file types from the directory listing, so no per-file stat is needed;
+    # the extension is checked first so other files skip even that
+    names = []
+    try:
+        with os.scandir("videos") as entries:
+            for entry in entries:
+                if os.path.splitext(entry.name)[1].lower() in VIDEO_EXTENSIONS and entry.is_file():
+                    names.append(entry.name)
+    except (FileNotFoundError, NotADirectoryError):
         return []
     
-    # Common video extensions
-    video_extensions = {'.mp4', '.avi', '.mov', '.mkv', '.webm', '.flv', '.wmv', '.m4v', '.3gp'}
-    
-    video_files = []
-    for file in videos_dir.iterdir():
-        if file.is_file() and file.suffix.lower() in video_extensions:
-            video_files.append(f"videos/{file.name}")
-    
-    return sorted(video_files)
+    # Sort the bare names, so comparisons skip the shared directory prefix
+    return [f"videos/{name}" for name in sorted(names, key=str.lower)]
 
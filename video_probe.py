@@ -0,0 +1,235 @@
+"""
+Video metadata probing module.
+
+Probes are cached in memory and in the result cache (on disk when diskcache is
+installed), keyed on (path, size, mtime), so repeated calls on the same file skip
+FFmpeg entirely.
+"""
+
+import functools
+import json
+import os
+import subprocess
+from collections import namedtuple
+from fractions import Fraction
+
+import cv2
+
+try:
+    import av
+except ImportError:  # PyAV is optional; fall back to OpenCV probing
+    av = None
+
+from result_cache import get_result, store_result
+
+# Part of every cache key; bump when the shape of a probe result changes
+_CACHE_VERSION = 2
+
+# Relative gap between the average and nominal frame rates above which a stream is
+# treated as variable frame rate
+_VFR_TOLERANCE = 0.01
+
+VideoInfo = namedtuple("VideoInfo", ["duration", "fps", "frame_count", "width", "height", "variable_frame_rate"])
+
+
+def probe_video(video_path):
+    """
+    Read basic metadata for the first video stream.
+    
+    Uses ffprobe when installed, otherwise PyAV or OpenCV.
+    
+    Args:
+        video_path: Path to the video file
+    
+    Returns:
+        VideoInfo with duration (seconds), fps, frame_count, width, height and
+        variable_frame_rate (False when it cannot be determined)
+    
+    Raises:
+        ValueError: If video file cannot be opened
+    """
+    return VideoInfo(**_probe(*_cache_key(video_path), "info"))
+
+
+def probe_keyframes(video_path):
+    """
+    List the timestamps of all keyframes in the first video stream.
+    
+    Only packet headers are read; no frame is decoded. Uses ffprobe when installed,
+    otherwise PyAV.
+    
+    Args:
+        video_path: Path to the video file
+    
+    Returns:
+        Sorted tuple of keyframe timestamps in seconds from the start of the stream, or
+        None if neither ffprobe nor PyAV is available
+    
+    Raises:
+        ValueError: If video file cannot be opened
+    """
+    keyframes = _probe(*_cache_key(video_path), "keyframes")
+    return tuple(keyframes) if keyframes is not None else None
+
+
+def _cache_key(video_path):
+    """Identify a file by (absolute path, size, mtime) so edits invalidate cached probes."""
+    try:
+        stat = os.stat(video_path)
+    except OSError as e:
+        raise ValueError(f"Cannot open video file: {video_path}") from e
+    return os.path.abspath(video_path), stat.st_size, stat.st_mtime_ns
+
+
+@functools.lru_cache(maxsize=256)
+def _probe(path, size, mtime_ns, kind):
+    """Return a cached probe result of the given kind ("info" or "keyframes"), computing it on a miss."""
+    key = f"probe:{kind}:v{_CACHE_VERSION}:{path}:{size}:{mtime_ns}"
+    value = get_result(key)
+    if value is not None:
+        return value
+
+    value = _probe_info(path) if kind == "info" else _probe_keyframes(path)
+    if value is not None:
+        store_result(key, value)
+    return value
+
+
+def _ffprobe(path, entries):
+    """
+    Run ffprobe on the first video stream and return its parsed JSON output.
+    
+    Returns:
+        Parsed JSON output, or None if ffprobe is not installed
+    
+    Raises:
+        ValueError: If ffprobe cannot read the file
+    """
+    command = [
+        "ffprobe", "-v", "error", "-select_streams", "v:0",
+        "-show_entries", entries, "-of", "json", path,
+    ]
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, check=False)
+    except FileNotFoundError:
+        return None
+    if result.returncode != 0:
+        raise ValueError(f"Cannot open video file: {path}")
+    return json.loads(result.stdout)
+
+
+def _probe_info(path):
+    """Read stream metadata with ffprobe, falling back to PyAV or OpenCV."""
+    output = _ffprobe(path, "stream=avg_frame_rate,r_frame_rate,nb_frames,duration,width,height:format=duration")
+    if output is None:
+        return _probe_info_with_decoder(path)
+    if not output.get("streams"):
+        raise ValueError(f"No video stream found in: {path}")
+
+    stream = output["streams"][0]
+    rates = [
+        float(Fraction(rate))
+        for rate in (stream.get("avg_frame_rate"), stream.get("r_frame_rate"))
+        if rate and not rate.endswith("/0")
+    ]
+    fps = rates[0] if rates else 0.0
+    duration = float(stream.get("duration") or output.get("format", {}).get("duration") or 0)
+    frame_count = int(stream["nb_frames"]) if stream.get("nb_frames") else int(duration * fps)
+    return {
+        "duration": duration,
+        "fps": fps,
+        "frame_count": frame_count,
+        "width": int(stream.get("width", 0)),
+        "height": int(stream.get("height", 0)),
+        "variable_frame_rate": len(rates) == 2 and _is_variable(*rates),
+    }
+
+
+def _probe_info_with_decoder(path):
+    """Read stream metadata by opening the file with PyAV, or OpenCV if PyAV is missing."""
+    if av is not None:
+        try:
+            container = av.open(path)
+        except av.error.FFmpegError as e:
+            raise ValueError(f"Cannot open video file: {path}") from e
+        try:
+            if not container.streams.video:
+                raise ValueError(f"No video stream found in: {path}")
+            stream = container.streams.video[0]
+            if stream.duration is not None:
+                duration = float(stream.duration * stream.time_base)
+            elif container.duration is not None:
+                duration = container.duration / av.time_base
+            else:
+                duration = 0
+            fps = float(stream.average_rate) if stream.average_rate else 0.0
+            return {
+                "duration": duration,
+                "fps": fps,
+                "frame_count": stream.frames or int(duration * fps),
+                "width": stream.codec_context.width,
+                "height": stream.codec_context.height,
+                "variable_frame_rate": bool(stream.average_rate and stream.base_rate)
+                and _is_variable(float(stream.average_rate), float(stream.base_rate)),
+            }
+        finally:
+            container.close()
+
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video file: {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    info = {
+        "duration": frame_count / fps if fps > 0 else 0,
+        "fps": fps,
+        "frame_count": frame_count,
+        "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        "variable_frame_rate": False,  # OpenCV only reports one rate
+    }
+    cap.release()
+    return info
+
+
+def _is_variable(average_rate, nominal_rate):
+    """Tell whether a stream's average frame rate strays from its nominal (timebase) rate."""
+    return abs(average_rate - nominal_rate) > _VFR_TOLERANCE * nominal_rate
+
+
+def _probe_keyframes(path):
+    """List keyframe timestamps from ffprobe packet flags, falling back to PyAV."""
+    output = _ffprobe(path, "stream=start_time:packet=pts_time,flags")
+    if output is None:
+        return _probe_keyframes_with_decoder(path)
+
+    streams = output.get("streams") or [{}]
+    start = float(streams[0].get("start_time") or 0)
+    return sorted(
+        float(packet["pts_time"]) - start
+        for packet in output.get("packets", [])
+        if "K" in packet.get("flags", "") and packet.get("pts_time") not in (None, "N/A")
+    )
+
+
+def _probe_keyframes_with_decoder(path):
+    """List keyframe timestamps by demuxing packets with PyAV."""
+    if av is None:
+        return None
+    try:
+        container = av.open(path)
+    except av.error.FFmpegError as e:
+        raise ValueError(f"Cannot open video file: {path}") from e
+    try:
+        if not container.streams.video:
+            raise ValueError(f"No video stream found in: {path}")
+        stream = container.streams.video[0]
+        start = stream.start_time or 0
+        # demux() only reads packet headers; nothing is decoded
+        return sorted(
+            float((packet.pts - start) * stream.time_base)
+            for packet in container.demux(stream)
+            if packet.is_keyframe and packet.pts is not None
+        )
+    finally:
+        container.close()
@@ -0,0 +1,305 @@
+"""
+Vision API request module shared by image and video analysis.
+
+Picks the Responses API or chat.completions for each model, builds the request
+payload and caches replies by image content and request parameters.
+"""
+
+import asyncio
+import binascii
+import functools
+import hashlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from openai import OpenAI, AsyncOpenAI, APIError, NOT_GIVEN
+from dotenv import load_dotenv
+from result_cache import result_key, get_result, store_result
+
+try:
+    from pybase64 import b64encode  # SIMD base64
+except ImportError:
+    # The C encoder behind base64.b64encode, called without the Python wrapper frame
+    b64encode = functools.partial(binascii.b2a_base64, newline=False)
+
+# Connection pool limits shared by both clients; HTTP/2 multiplexes concurrent requests
+# over one connection
+_HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32, max_connections=64)
+
+# Default request timeout; multi-image batch replies can run well past a minute
+REQUEST_TIMEOUT = 120.0
+
+# Models sent through the Responses API; everything else uses chat.completions.
+# Decided once here, since openai releases before 1.66 have no responses resource
+RESPONSES_MODELS = frozenset({"gpt-4.1"}) if hasattr(OpenAI, "responses") else frozenset()
+
+# Uploads are network-bound, so they get their own pool
+_UPLOAD_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="image-upload")
+
+_EXTENSIONS = {"image/jpeg": "jpg", "image/png": "png", "image/webp": "webp"}
+
+
+@functools.lru_cache(maxsize=1)
+def get_client():
+    """
+    Return the shared OpenAI client, creating it on first use.
+    
+    Creating the client loads .env (unless OPENAI_API_KEY is already set) and sets up
+    the keep-alive HTTP/2 connection pool and TLS context, so importing this module does
+    neither. The transport retries failed connection attempts itself, before a request
+    is sent, and the client retries transient failures (connection errors, 408/409/429
+    and 5xx) with exponential backoff and jitter, honouring Retry-After.
+    """
+    _load_env()
+    transport = httpx.HTTPTransport(http2=True, limits=_HTTP_LIMITS, retries=2)
+    return OpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"), http_client=httpx.Client(transport=transport),
+        timeout=REQUEST_TIMEOUT, max_retries=4,
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def get_async_client():
+    """Return the shared AsyncOpenAI client, creating it on first use (see get_client)."""
+    _load_env()
+    transport = httpx.AsyncHTTPTransport(http2=True, limits=_HTTP_LIMITS, retries=2)
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"), http_client=httpx.AsyncClient(transport=transport),
+        timeout=REQUEST_TIMEOUT, max_retries=4,
+    )
+
+
+def _load_env():
+    """Load environment variables; skip reading .env when the key is already set (e.g. in containers)."""
+    if not os.getenv("OPENAI_API_KEY"):
+        load_dotenv()
+
+
+def call_vision(images, prompt, model, max_tokens=1000, labels=None, upload=False, timeout=None, parse=None, on_latency=None):
+    """
+    Send images and a prompt to the vision API picked for the model.
+    
+    Replies are cached by image content and request parameters, so repeating a request
+    returns without calling the API.
+    
+    Args:
+        images: List of (image bytes, MIME type) pairs
+        prompt: Text sent before the images
+        model: Model to use; models in RESPONSES_MODELS go through the Responses API,
+            all others through chat.completions
+        max_tokens: Maximum number of reply tokens (default: 1000)
+        labels: Optional text sent just before each image (e.g. "Image 1:")
+        upload: Upload the images through the Files API and reference them by file ID
+            instead of inlining base64 data URLs, falling back to data URLs if an upload
+            fails; the files are deleted once the request finishes (Responses API only;
+            default: False)
+        timeout: Request timeout in seconds (None for REQUEST_TIMEOUT)
+        parse: Optional function applied to the reply text; a reply is only cached if
+            it parses, so a malformed reply is not served again
+        on_latency: Optional function called with the API round-trip time in seconds
+            (uploads included); not called when the reply comes from the cache
+    
+    Returns:
+        Reply text, or the result of parse
+    
+    Raises:
+        RuntimeError: If API call fails
+    """
+    key = result_key([data for data, _ in images], prompt, model, max_tokens, *(labels or ()))
+    reply = get_result(key)
+    if reply is not None:
+        return parse(reply) if parse is not None else reply
+
+    started = time.monotonic()
+    if model in RESPONSES_MODELS:
+        file_ids = _try_upload(images) if upload else None
+        try:
+            response = get_client().responses.create(
+                model=model,
+                input=_build_input(images, prompt, labels, file_ids),
+                max_output_tokens=max_tokens,
+                timeout=timeout if timeout is not None else NOT_GIVEN
+            )
+        finally:
+            if file_ids:
+                _delete_files(file_ids)
+        reply = response.output_text
+    else:
+        response = get_client().chat.completions.create(
+            model=model,
+            messages=_build_messages(images, prompt, labels),
+            max_tokens=max_tokens,
+            timeout=timeout if timeout is not None else NOT_GIVEN
+        )
+        reply = response.choices[0].message.content
+    if on_latency is not None:
+        on_latency(time.monotonic() - started)
+    result = parse(reply) if parse is not None else reply
+    store_result(key, reply)
+    return result
+
+
+async def acall_vision(images, prompt, model, max_tokens=1000, labels=None, upload=False, timeout=None, parse=None, on_latency=None):
+    """
+    Async variant of call_vision, using the async client.
+    
+    Returns:
+        Reply text, or the result of parse
+    
+    Raises:
+        RuntimeError: If API call fails
+    """
+    key = result_key([data for data, _ in images], prompt, model, max_tokens, *(labels or ()))
+    reply = get_result(key)
+    if reply is not None:
+        return parse(reply) if parse is not None else reply
+
+    started = time.monotonic()
+    if model in RESPONSES_MODELS:
+        # Uploads block on the network, so run them off the event loop
+        file_ids = await asyncio.to_thread(_try_upload, images) if upload else None
+        try:
+            response = await get_async_client().responses.create(
+                model=model,
+                input=_build_input(images, prompt, labels, file_ids),
+                max_output_tokens=max_tokens,
+                timeout=timeout if timeout is not None else NOT_GIVEN
+            )
+        finally:
+            if file_ids:
+                _delete_files(file_ids)
+        reply = response.output_text
+    else:
+        response = await get_async_client().chat.completions.create(
+            model=model,
+            messages=_build_messages(images, prompt, labels),
+            max_tokens=max_tokens,
+            timeout=timeout if timeout is not None else NOT_GIVEN
+        )
+        reply = response.choices[0].message.content
+    if on_latency is not None:
+        on_latency(time.monotonic() - started)
+    result = parse(reply) if parse is not None else reply
+    store_result(key, reply)
+    return result
+
+
+def data_url(data, mime):
+    """Encode image bytes as a base64 data URL."""
+    # Joining as bytes and decoding once builds the URL with a single str allocation;
+    # base64 output is pure ASCII, so the ascii codec's fast path is safe
+    return (_data_url_prefix(mime) + b64encode(data)).decode('ascii')
+
+
+@functools.lru_cache(maxsize=8)
+def _data_url_prefix(mime):
+    """Return the bytes that start a base64 data URL of the given MIME type."""
+    return f"data:{mime};base64,".encode('ascii')
+
+
+def _build_input(images, prompt, labels, file_ids):
+    """Build Responses API input pairing a prompt with images, by file ID if given, else by data URL."""
+    if file_ids is not None:
+        image_parts = [{"type": "input_image", "file_id": file_id} for file_id in file_ids]
+    else:
+        image_parts = [{"type": "input_image", "image_url": data_url(data, mime)} for data, mime in images]
+    return [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "input_text",
+                    "text": prompt
+                },
+                *_with_labels(image_parts, labels, "input_text")
+            ]
+        }
+    ]
+
+
+def _build_messages(images, prompt, labels):
+    """Build chat.completions messages pairing a prompt with images sent as data URLs."""
+    image_parts = [{"type": "image_url", "image_url": {"url": data_url(data, mime)}} for data, mime in images]
+    return [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": prompt
+                },
+                *_with_labels(image_parts, labels, "text")
+            ]
+        }
+    ]
+
+
+def _with_labels(image_parts, labels, text_type):
+    """Interleave a text part carrying each label before its image part."""
+    if labels is None:
+        return image_parts
+    return [
+        part
+        for label, image_part in zip(labels, image_parts)
+        for part in ({"type": text_type, "text": label}, image_part)
+    ]
+
+
+def _try_upload(images):
+    """
+    Upload images for one request, returning their file IDs.
+    
+    Returns None if the Files API rejects an upload, so the request itself still goes
+    through with every image sent inline as a data URL.
+    """
+    try:
+        return _upload_images(images)
+    except APIError:
+        return None  # Uploads are an optimization; the caller falls back to data URLs
+
+
+def _upload_images(images):
+    """
+    Upload images through the Files API, returning one file ID per image.
+    
+    Uploads run in parallel, and identical images in one request are uploaded once. If
+    any upload fails, the files already uploaded are deleted before the error is raised.
+    """
+    digests = [hashlib.blake2b(data, digest_size=20).hexdigest() for data, _ in images]
+    unique = dict(zip(digests, images))
+    uploads = {
+        digest: _UPLOAD_POOL.submit(
+            get_client().files.create,
+            file=(f"image.{_EXTENSIONS.get(mime, 'jpg')}", data, mime),
+            purpose="vision",
+        )
+        for digest, (data, mime) in unique.items()
+    }
+
+    file_ids = {}
+    error = None
+    for digest, upload in uploads.items():
+        try:
+            file_ids[digest] = upload.result().id
+        except APIError as e:
+            error = e
+    if error is not None:
+        _delete_files(file_ids.values())
+        raise error
+    return [file_ids[digest] for digest in digests]
+
+
+def _delete_files(file_ids):
+    """Delete uploaded files in the background once a request no longer needs them."""
+    for file_id in set(file_ids):
+        _UPLOAD_POOL.submit(_delete_file, file_id)
+
+
+def _delete_file(file_id):
+    """Delete one uploaded file, ignoring failures; an orphaned file only costs storage."""
+    try:
+        get_client().files.delete(file_id)
+    except APIError:
+        pass